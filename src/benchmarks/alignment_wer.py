@@ -0,0 +1,226 @@
+"""
+Measures the throughput, latency percentiles and peak memory of the alignment and WER components: the alignment
+engines (pure-Python, vectorized wavefront, linear-memory and score/count-only), the nested word alignment used for
+the WER, AccuracyStatistics, and the rule steps of NormalizeText (without its models).
+
+The sentence pairs are synthetic, so the benchmark runs offline: reference texts of a given length (in words) are
+made of the sentences of validated_sentences.tsv, and the transcribed texts are made from them by random
+substitutions, insertions and deletions at a given error rate. If the sentences file is missing, random Hebrew words
+are used instead. The same seed gives the same pairs.
+
+Run from the src folder:
+    python -m benchmarks.alignment_wer [--lengths 10 30 100] [--error-rates 0.1 0.3] [--output results.json]
+
+The results are printed as a table, and written as JSON (with the commit and the settings) if an output file is
+given, so they can be compared across commits.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+
+from modules.accuracy_statistics import AccuracyStatistics
+from modules.align_sequences import align_sequences
+from modules.corpus_io import iter_tsv_rows
+from modules.edit_weights import PAIR_WEIGHT_CACHE, LevenshteinWeights, NestedUniformWeights
+from modules.linear_alignment import align_score_counts, align_sequences_linear
+
+# The paths are relative to the src folder
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SENTENCES_FILE = os.path.join(SRC_DIR, '..', 'cv-corpus-24.0-2025-12-05', 'he', 'validated_sentences.tsv')
+
+HEBREW_LETTERS = 'אבגדהוזחטיכלמנסעפצקרשת'
+
+# A synthetic sentence pair: (reference words, transcribed words)
+SentencePair = Tuple[List[str], List[str]]
+
+
+class PythonLevenshteinWeights(LevenshteinWeights):
+    """
+    Levenshtein weights that the wavefront engine doesn't match (it matches the exact constant-weight classes only),
+    so align_sequences runs its pure-Python loop on them.
+    """
+
+
+def read_sentences(filename: str, limit: int = 20000) -> List[List[str]]:
+    """
+    Read the words of up to limit sentences, or generate random sentences of Hebrew words if the file is missing.
+    """
+    if os.path.exists(filename):
+        sentences = []
+        for sentence, in iter_tsv_rows(filename, ['sentence']):
+            if isinstance(sentence, str) and sentence.split():
+                sentences.append(sentence.split())
+                if len(sentences) >= limit:
+                    break
+        if sentences:
+            return sentences
+
+    rng = random.Random(0)
+    vocabulary = [''.join(rng.choice(HEBREW_LETTERS) for _ in range(rng.randint(2, 7))) for _ in range(5000)]
+    return [[rng.choice(vocabulary) for _ in range(rng.randint(3, 15))] for _ in range(limit)]
+
+
+def make_pairs(sentences: List[List[str]], num_pairs: int, length: int, error_rate: float,
+               seed: int = 0) -> List[SentencePair]:
+    """
+    Make sentence pairs whose references have length words, and whose transcriptions have a substitution, an
+    insertion or a deletion (equally likely) at each word with probability error_rate.
+    """
+    rng = random.Random(f"{seed}:{length}:{error_rate}")
+    vocabulary = sorted({word for sentence in sentences for word in sentence})
+
+    pairs = []
+    for _ in range(num_pairs):
+        reference = []
+        while len(reference) < length:
+            reference.extend(rng.choice(sentences))
+        reference = reference[:length]
+
+        transcribed = []
+        for word in reference:
+            if rng.random() >= error_rate:
+                transcribed.append(word)
+                continue
+            operation = rng.choice(['substitution', 'insertion', 'deletion'])
+            if operation == 'substitution':
+                transcribed.append(rng.choice(vocabulary))
+            elif operation == 'insertion':
+                transcribed.extend([word, rng.choice(vocabulary)])
+
+        pairs.append((reference, transcribed))
+    return pairs
+
+
+def _normalize_rules() -> Callable[[SentencePair], Tuple[str, str]]:
+    # The rule steps of NormalizeText, in order, on both texts of a pair (the models and Phunspell are not loaded)
+    from modules.normalize_text import NormalizeText
+    normalize = NormalizeText()
+
+    def normalize_rules(text: str) -> str:
+        text = normalize._normalize_before_spelling(text)
+        text = normalize._normalize_after_spelling(text)
+        return normalize._normalize_after_segmentation(text)
+
+    return lambda pair: (normalize_rules(' '.join(pair[0])), normalize_rules(' '.join(pair[1])))
+
+
+# The benchmarked components: name -> function of a sentence pair. Each is set up by a factory, outside the timing.
+COMPONENTS: Dict[str, Callable[[], Callable[[SentencePair], object]]] = {
+    'align_python': lambda: lambda pair: align_sequences(pair[0], pair[1], PythonLevenshteinWeights()),
+    # A band that covers the whole matrix forces the wavefront engine, even for small matrices
+    'align_wavefront': lambda: lambda pair: align_sequences(pair[0], pair[1], LevenshteinWeights(),
+                                                            band=max(len(pair[0]), len(pair[1]))),
+    'align_linear': lambda: lambda pair: align_sequences_linear(pair[0], pair[1], LevenshteinWeights()),
+    'score_counts': lambda: lambda pair: align_score_counts(pair[0], pair[1], LevenshteinWeights()),
+    'align_nested': lambda: lambda pair: align_sequences(pair[0], pair[1], NestedUniformWeights()),
+    'accuracy_statistics': lambda: lambda pair: AccuracyStatistics(pair[0], pair[1]),
+    'normalize_rules': _normalize_rules,
+}
+
+
+def measure(component: str, pairs: List[SentencePair], repeat: int = 1) -> dict:
+    """
+    Run a component on every pair, and measure its throughput, the percentiles of its latency per pair, and its
+    peak memory (in a separate pass, as tracing the allocations slows it down).
+    """
+    run = COMPONENTS[component]()
+
+    # The word pair scores of the nested alignment are computed again in every measurement
+    PAIR_WEIGHT_CACHE.clear()
+
+    latencies = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for pair in pairs:
+                pair_start = time.perf_counter()
+                run(pair)
+                latencies.append(time.perf_counter() - pair_start)
+        wall_seconds = time.perf_counter() - start
+
+        PAIR_WEIGHT_CACHE.clear()
+        tracemalloc.start()
+        for pair in pairs:
+            run(pair)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    words = repeat * sum(len(reference) + len(transcribed) for reference, transcribed in pairs)
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'pairs_per_sec': len(latencies) / wall_seconds if wall_seconds > 0 else 0,
+        'words_per_sec': words / wall_seconds if wall_seconds > 0 else 0,
+        'latency_ms': {
+            'mean': float(latencies_ms.mean()),
+            'p50': float(np.percentile(latencies_ms, 50)),
+            'p95': float(np.percentile(latencies_ms, 95)),
+            'p99': float(np.percentile(latencies_ms, 99))
+        },
+        'peak_memory_kb': peak_bytes / 1024
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=SRC_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the alignment and WER components.')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[10, 30, 100], help='Reference lengths in words')
+    parser.add_argument('--error-rates', type=float, nargs='+', default=[0.1, 0.3], help='Word error rates')
+    parser.add_argument('--pairs', type=int, default=50, help='Number of sentence pairs of every corpus')
+    parser.add_argument('--repeat', type=int, default=1, help='Number of timed passes over every corpus')
+    parser.add_argument('--components', nargs='+', default=list(COMPONENTS), choices=list(COMPONENTS))
+    parser.add_argument('--sentences', default=SENTENCES_FILE, help='The sentences of the synthetic corpora')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    os.chdir(SRC_DIR)
+    sentences = read_sentences(args.sentences)
+
+    results = []
+    print(f"{'component':<22}{'length':>8}{'error':>7}{'pairs/s':>11}{'words/s':>12}"
+          f"{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'peak (KB)':>11}")
+    for length in args.lengths:
+        for error_rate in args.error_rates:
+            pairs = make_pairs(sentences, args.pairs, length, error_rate, args.seed)
+            for component in args.components:
+                result = {'component': component, 'length': length, 'error_rate': error_rate,
+                          **measure(component, pairs, args.repeat)}
+                results.append(result)
+                latency = result['latency_ms']
+                print(f"{component:<22}{length:>8}{error_rate:>7.2f}{result['pairs_per_sec']:>11.1f}"
+                      f"{result['words_per_sec']:>12.0f}{latency['p50']:>10.3f}{latency['p95']:>10.3f}"
+                      f"{latency['p99']:>10.3f}{result['peak_memory_kb']:>11.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'benchmark': 'alignment_wer',
+                'commit': git_commit(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'settings': {'pairs': args.pairs, 'repeat': args.repeat, 'seed': args.seed,
+                             'sentences': os.path.basename(args.sentences) if os.path.exists(args.sentences)
+                             else 'random'},
+                'results': results
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Measures the startup time of each entry point: importing its module and constructing its objects, before any clip is
+transcribed or any text is normalized. Each measurement runs in a fresh Python process, so nothing is imported or
+loaded in advance. The heavy modules imported during startup are listed as well (none should be, as the models and
+their libraries are loaded on first use).
+
+Run from the src folder:
+    python -m benchmarks.startup_time [--repeat N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Modules that should not be imported before they are needed
+HEAVY_MODULES = ['torch', 'transformers', 'faster_whisper', 'ctranslate2', 'phunspell', 'IPython']
+
+# The code that starts each entry point, in a scratch folder {tmp} for the caches it creates
+ENTRY_POINTS = {
+    'part1': (
+        'import part1',
+        "part1.Part1(os.path.join('results', 'part1_transcriptions.tsv'), 'clips', os.path.join({tmp!r}, 'out.tsv'), "
+        "transcription_cache_file=os.path.join({tmp!r}, 'transcriptions.sqlite'))"
+    ),
+    'part2': (
+        'import part2',
+        "part2.Part2(os.path.join('results', 'part1_transcriptions.tsv'), os.path.join({tmp!r}, 'stats.csv'), "
+        "os.path.join({tmp!r}, 'out.tsv'), pair_weight_cache_file=os.path.join('cache', 'pair_weight_cache.json'))"
+    ),
+    'part3': (
+        'import part3',
+        "part3.Part2(os.path.join('results', 'part1_transcriptions.tsv'), os.path.join({tmp!r}, 'stats.csv'), "
+        "os.path.join({tmp!r}, 'out.tsv'), pair_weight_cache_file=os.path.join('cache', 'pair_weight_cache.json'), "
+        "normalization_cache_file=os.path.join({tmp!r}, 'normalization.sqlite'), "
+        "spelling_cache_file=os.path.join({tmp!r}, 'spelling.sqlite'))"
+    ),
+    'part4': (
+        'import part4',
+        "part4.Part1(part4.TEST_TSV, part4.OUTPUT_DIR, os.path.join({tmp!r}, 'out.tsv'), "
+        "transcription_cache_file=os.path.join({tmp!r}, 'transcriptions.sqlite')); "
+        "part4.Part2(part4.NOISY_TRANSCRIPTIONS_FILE, os.path.join({tmp!r}, 'stats.csv'), "
+        "os.path.join({tmp!r}, 'out.tsv'), pair_weight_cache_file=part4.PAIR_WEIGHT_CACHE_FILE, "
+        "normalization_cache_file=os.path.join({tmp!r}, 'normalization.sqlite'), "
+        "spelling_cache_file=os.path.join({tmp!r}, 'spelling.sqlite'))"
+    ),
+}
+
+_MEASURE = '''
+import json, os, sys, time
+start = time.perf_counter()
+{import_code}
+imported = time.perf_counter()
+{construct_code}
+constructed = time.perf_counter()
+print(json.dumps({{
+    'import_seconds': imported - start,
+    'construct_seconds': constructed - imported,
+    'heavy_modules': [name for name in {heavy_modules!r} if name in sys.modules]
+}}))
+'''
+
+
+def measure(entry_point: str) -> dict:
+    """
+    Start the given entry point in a fresh process and measure its startup.
+    """
+    import_code, construct_code = ENTRY_POINTS[entry_point]
+    with tempfile.TemporaryDirectory() as tmp:
+        code = _MEASURE.format(import_code=import_code, construct_code=construct_code.format(tmp=tmp),
+                               heavy_modules=HEAVY_MODULES)
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the startup time of the entry points.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of measurements of each entry point')
+    parser.add_argument('--entry-points', nargs='+', default=list(ENTRY_POINTS), choices=list(ENTRY_POINTS))
+    args = parser.parse_args()
+
+    # The entry points use paths relative to the src folder
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    print(f"{'entry point':<12}{'import (s)':>12}{'construct (s)':>15}{'total (s)':>12}  heavy modules")
+    for entry_point in args.entry_points:
+        runs = [measure(entry_point) for _ in range(args.repeat)]
+        import_seconds = statistics.median(run['import_seconds'] for run in runs)
+        construct_seconds = statistics.median(run['construct_seconds'] for run in runs)
+        heavy_modules = ', '.join(runs[-1]['heavy_modules']) or '-'
+        print(f"{entry_point:<12}{import_seconds:>12.3f}{construct_seconds:>15.3f}"
+              f"{import_seconds + construct_seconds:>12.3f}  {heavy_modules}")
+
+
+if __name__ == '__main__':
+    main()
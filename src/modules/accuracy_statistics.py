@@ -1,31 +1,84 @@
 from modules.align_sequences import align_sequences
+from modules.linear_alignment import align_sequences_linear
 from modules.edit_weights import NestedUniformWeights
-from collections import Counter
-from typing import List, Tuple
+from modules.error_counter import ErrorCounter
+from modules.instrumentation import INSTRUMENTATION
+from typing import List, Optional, Tuple
 
 class AccuracyStatistics:
-    def __init__(self, reference_text: List[str]=[], transcribed_text: List[str]=[]):
-        self.aligned_score, self.aligned_pairs = align_sequences(reference_text, transcribed_text, NestedUniformWeights())
-        self.all_differences = self.get_difference()
+    # The statistics of millions of utterances are kept compact by __slots__ (no dict per instance).
+    __slots__ = ('aligned_score', '_aligned_pairs', '_texts', 'all_differences', 'errors',
+                 'N_gt', 'N_asr', 'M', 'S', 'I', 'D', 'wer', 'recall', 'precision', 'f1_score')
+
+    # Long-form transcripts (e.g. whole recordings) can be aligned in linear memory by setting linear_memory.
+    # If keep_pairs is not set, the aligned pairs are not kept after counting them, and they are aligned again only
+    # if they are accessed. Without texts, the statistics are zero (an identity for accumulating), and nothing is
+    # aligned.
+    # The word-level alignment is timed as one stage, including the character-level alignments of its word pairs
+    # (align_sequences itself is not timed, as the nested weights call it recursively).
+    def __init__(self, reference_text: List[str]=(), transcribed_text: List[str]=(), linear_memory: bool = False,
+                 keep_pairs: bool = True):
+        # The errors of all the accumulated statistics are counted here by __iadd__, instead of being collected
+        self.errors = None
         self.N_gt = len(reference_text)
         self.N_asr = len(transcribed_text)
-        self.M = len(self.get_matches())
-        self.S = len(self.get_substitutions())
-        self.I = len(self.get_insertions())
-        self.D = len(self.get_deletions())
+
+        if self.N_gt == 0 and self.N_asr == 0:
+            self.aligned_score, self._aligned_pairs, self._texts = 0.0, [], None
+            self.all_differences = []
+            self.M = self.S = self.I = self.D = 0
+        else:
+            align = align_sequences_linear if linear_memory else align_sequences
+            with INSTRUMENTATION.stage('accuracy.align_words'):
+                self.aligned_score, aligned_pairs = align(reference_text, transcribed_text, NestedUniformWeights())
+            self._aligned_pairs = aligned_pairs if keep_pairs else None
+            self._texts = None if keep_pairs else (reference_text, transcribed_text, linear_memory)
+            self._count(aligned_pairs)
+
         self.wer = self.get_wer()
         self.recall = self.get_recall()
         self.precision = self.get_precision()
         self.f1_score = self.get_f1_score()
 
+    # Count the matches, substitutions, insertions and deletions, and collect the differences, in one pass
+    def _count(self, aligned_pairs: List[Tuple]):
+        matches = substitutions = insertions = deletions = 0
+        differences = []
+        for a, b in aligned_pairs:
+            if a == b:
+                matches += 1
+                continue
+            if a is None:
+                insertions += 1
+                differences.append(("", b))
+            elif b is None:
+                deletions += 1
+                differences.append((a, ""))
+            else:
+                substitutions += 1
+                differences.append((a, b))
+        self.M, self.S, self.I, self.D = matches, substitutions, insertions, deletions
+        self.all_differences = differences
+
+    @property
+    def aligned_pairs(self) -> List[Tuple]:
+        if self._aligned_pairs is None:
+            reference_text, transcribed_text, linear_memory = self._texts
+            align = align_sequences_linear if linear_memory else align_sequences
+            with INSTRUMENTATION.stage('accuracy.align_words'):
+                _, self._aligned_pairs = align(reference_text, transcribed_text, NestedUniformWeights())
+        return self._aligned_pairs
+
+    # The errors are counted by an exact counter, unless the capacity of an approximate (Space-Saving) counter is
+    # given, e.g. to bound the memory of the totals of a very large corpus. It must be set before accumulating.
+    def count_errors(self, capacity: Optional[int] = None) -> ErrorCounter:
+        if self.errors is None:
+            self.errors = ErrorCounter(capacity)
+            self.errors.update(self.all_differences)
+        return self.errors
+
     def frequent_errors(self, k: int = 0) -> List[Tuple]:
-        if k == 0:
-            k = len(self.all_differences)
-        errors = dict[Tuple[str, str], int](Counter[Tuple[str, str]](self.all_differences))
-        errors = dict[Tuple[str, str], int](sorted(errors.items(), key=lambda x: x[1], reverse=True))
-        word_pairs = [(error[0], error[1]) for error in errors.keys()]
-        word_pairs_cnt = [error for error in errors.values()]
-        return list[Tuple[str, str], int](zip(word_pairs, word_pairs_cnt))[:k]
+        return self.count_errors().most_common(k)
 
     def get_difference(self) -> List[Tuple]:
         differences = [(a if a is not None else "", b if b is not None else "") 
@@ -67,7 +120,10 @@ class AccuracyStatistics:
         self.recall += other.recall
         self.precision += other.precision
         self.f1_score += other.f1_score
-        self.all_differences.extend(other.all_differences)
+        if other.errors is not None:
+            self.count_errors().merge(other.errors)
+        else:
+            self.count_errors().update(other.all_differences)
         return self
 
     def to_dict(self) -> dict:
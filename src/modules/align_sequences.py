@@ -1,19 +1,31 @@
-from typing import Iterable, List, Tuple
+import logging
+from typing import Iterable, List, Optional, Tuple
 import numpy as np
+from modules.alignment_ops import OP_NULL, OP_PAIR, OP_INS, OP_DEL, backtrace
 from modules.edit_weights import EditWeights
+from modules.wavefront_alignment import MIN_WAVEFRONT_CELLS, supports_weights, encode_sequences, wavefront_fill
+
+logger = logging.getLogger(__name__)
+
 
 def align_sequences(first_seq: Iterable,
                     second_seq: Iterable,
-                    weights: EditWeights, debug: bool = False) -> Tuple[float, List[Tuple]]:
+                    weights: EditWeights, debug: bool = False,
+                    band: Optional[int] = None) -> Tuple[float, List[Tuple]]:
     """
     Perform global alignment between the two given sequences and compute the score of the optimal alignment with respect
     to the given edit weights.
 
     If the lengths of the input sequences are m and n, this function takes O(mn) time and uses O(mn) memory.
 
+    For the constant-weight classes (see modules.wavefront_alignment) the matrices are filled by the vectorized
+    wavefront engine, which returns the same score and aligned pairs. Any other edit weights use the pure-Python loop.
+
     @param first_seq The first sequence of aligned objects.
     @param second_seq The second sequence of aligned objects.
     @param weights The edit weights.
+    @param debug Log every edit operation at the DEBUG level (forces the pure-Python loop).
+    @param band Only compute the entries within this distance of the main diagonal (wavefront engine only).
     @return The computed score of the optimal global alignment.
     @return An output list of the aligned object pairs:
             The list contains pairs of the form (a_i, b_j) of objects from the first and the second input
@@ -21,22 +33,24 @@ def align_sequences(first_seq: Iterable,
            sequence, and the pair (a_i, None) represents object deletion from the first sequence.
     """
 
-    # Codes for the various edit operations:
-    _OP_NULL = 0
-    _OP_PAIR = 1
-    _OP_INS = 2
-    _OP_DEL = 3
-
-    # Create the matrix of alignment scores and the matrix of back pointers.
     first_len = len(first_seq)
     second_len = len(second_seq)
 
+    # Use the vectorized wavefront engine for constant weights, unless the matrices are too small to benefit from it.
+    if not debug and supports_weights(weights) and \
+            (band is not None or first_len * second_len >= MIN_WAVEFRONT_CELLS):
+        encoded = encode_sequences(first_seq, second_seq)
+        if encoded is not None:
+            score, ops_mat = wavefront_fill(encoded[0], encoded[1], weights, band)
+            return score, backtrace(ops_mat, first_seq, second_seq)
+
+    # Create the matrix of alignment scores and the matrix of back pointers.
     scores_mat = np.zeros((first_len + 1, second_len + 1))
     ops_mat = np.zeros((first_len + 1, second_len + 1), dtype=np.int8)
 
     # Set up the initial matrix entry.
     scores_mat[0, 0] = 0
-    ops_mat[0, 0] = _OP_NULL
+    ops_mat[0, 0] = OP_NULL
 
     # Fill the 0'th row, corresponding to the insertion of the objects in the second sequence.
     j = 1
@@ -45,10 +59,10 @@ def align_sequences(first_seq: Iterable,
         ins_wgt = scores_mat[0, j - 1] + weights.insertion_weight(second_obj)
 
         scores_mat[0, j] = ins_wgt
-        ops_mat[0, j] = _OP_INS
+        ops_mat[0, j] = OP_INS
 
         if debug:
-            print(f"Insert {second_obj} to the second sequence")
+            logger.debug("Insert %s to the second sequence", second_obj)
 
         j += 1
 
@@ -59,37 +73,37 @@ def align_sequences(first_seq: Iterable,
         del_wgt = scores_mat[i - 1, 0] + weights.deletion_weight(first_obj)
 
         scores_mat[i, 0] = del_wgt
-        ops_mat[i, 0] = _OP_DEL
+        ops_mat[i, 0] = OP_DEL
 
         if debug:
-            print(f"Delete {first_obj} from the first sequence")
+            logger.debug("Delete %s from the first sequence", first_obj)
 
         # Fill the rest of the row: Go over all objects of the second sequence.
         j = 1
         for second_obj in second_seq:
             # Accumulate the match or substitution weight with the weight of the corresponding predecessor entry.
             max_wgt = scores_mat[i - 1, j - 1] + weights.pair_weight(first_obj, second_obj)
-            best_op = _OP_PAIR
+            best_op = OP_PAIR
 
             # Accumulate the current insertion weight with the weight of the corresponding predecessor entry.
             ins_wgt = scores_mat[i, j - 1] + weights.insertion_weight(second_obj)
             if ins_wgt > max_wgt:
                 max_wgt = ins_wgt
-                best_op = _OP_INS
+                best_op = OP_INS
 
             # Accumulate the current deletion weight with the weight of the corresponding predecessor entry.
             del_wgt = scores_mat[i - 1, j] + weights.deletion_weight(first_obj)
             if del_wgt > max_wgt:
                 max_wgt = del_wgt
-                best_op = _OP_DEL
+                best_op = OP_DEL
 
             if debug:
-                if best_op == _OP_PAIR:
-                    print(f"Replace {first_obj} with {second_obj}")
-                elif best_op == _OP_INS:
-                    print(f"Insert {second_obj} to the second sequence")
-                elif best_op == _OP_DEL:
-                    print(f"Delete {first_obj} from the first sequence")
+                if best_op == OP_PAIR:
+                    logger.debug("Replace %s with %s", first_obj, second_obj)
+                elif best_op == OP_INS:
+                    logger.debug("Insert %s to the second sequence", second_obj)
+                elif best_op == OP_DEL:
+                    logger.debug("Delete %s from the first sequence", first_obj)
 
             # Store the selected maximum weight and its corresponding operation.
             scores_mat[i, j] = max_wgt
@@ -101,36 +115,8 @@ def align_sequences(first_seq: Iterable,
         # Proceed to the next object in the first sequence.
         i += 1
 
-    # Start with an empty list of aligned pairs, and from the given row and column.
-    aligned_pairs = []
-    i = first_len
-    j = second_len
-
-    while i > 0 or j > 0:
-        # Check the edit operation at the current entry and act accordingly.
-        curr_op = ops_mat[i, j]
-
-        if curr_op == _OP_PAIR:
-            # Pair operation: go back to the previous row and the previous column.
-            i -= 1
-            j -= 1
-            aligned_pairs.append((first_seq[i], second_seq[j]))
-
-        elif curr_op == _OP_INS:
-            # Insertion operation: go back to the previous column in the same row.
-            j -= 1
-            aligned_pairs.append((None, second_seq[j]))
-
-        elif curr_op == _OP_DEL:
-            # Deletion operation: go back to the previous row in the same column.
-            i -= 1
-            aligned_pairs.append((first_seq[i], None))
-
-        else:
-            break
-
-    # As we traced the alignment backwards, we have to reverse the list of aligned pairs.
-    aligned_pairs.reverse()
+    # Trace the back pointers to recover the aligned pairs.
+    aligned_pairs = backtrace(ops_mat, first_seq, second_seq)
 
     #if isinstance(weights, LevenshteinWeights):
     #    scores_mat = np.abs(scores_mat)
@@ -0,0 +1,52 @@
+from typing import List, Sequence, Tuple
+import numpy as np
+
+# Codes for the various edit operations stored in the matrix of back pointers.
+OP_NULL = 0
+OP_PAIR = 1
+OP_INS = 2
+OP_DEL = 3
+
+
+def backtrace(ops_mat: np.ndarray, first_seq: Sequence, second_seq: Sequence) -> List[Tuple]:
+    """
+    Trace the matrix of back pointers from its bottom-right entry and recover the aligned object pairs.
+
+    @param ops_mat The (m+1)x(n+1) matrix of back pointers filled by the alignment.
+    @param first_seq The first sequence of aligned objects.
+    @param second_seq The second sequence of aligned objects.
+    @return The list of aligned object pairs, ordered from the start of the sequences.
+    """
+
+    # Start with an empty list of aligned pairs, and from the given row and column.
+    aligned_pairs = []
+    i = len(first_seq)
+    j = len(second_seq)
+
+    while i > 0 or j > 0:
+        # Check the edit operation at the current entry and act accordingly.
+        curr_op = ops_mat[i, j]
+
+        if curr_op == OP_PAIR:
+            # Pair operation: go back to the previous row and the previous column.
+            i -= 1
+            j -= 1
+            aligned_pairs.append((first_seq[i], second_seq[j]))
+
+        elif curr_op == OP_INS:
+            # Insertion operation: go back to the previous column in the same row.
+            j -= 1
+            aligned_pairs.append((None, second_seq[j]))
+
+        elif curr_op == OP_DEL:
+            # Deletion operation: go back to the previous row in the same column.
+            i -= 1
+            aligned_pairs.append((first_seq[i], None))
+
+        else:
+            break
+
+    # As we traced the alignment backwards, we have to reverse the list of aligned pairs.
+    aligned_pairs.reverse()
+
+    return aligned_pairs
@@ -0,0 +1,51 @@
+import time
+from typing import Dict, Hashable, List, Optional
+
+
+def longest_first(keys: List[Hashable], durations: Dict[Hashable, float]) -> List[Hashable]:
+    """
+    Order clips longest-first by their durations, keeping the original order of clips of equal duration.
+
+    Workers that take the next clip from a shared queue then get the long clips first and finish on short ones,
+    instead of a long clip tailing the run, and clips of similar length are transcribed next to each other. Clips
+    without a known duration are scheduled last.
+    """
+    return sorted(keys, key=lambda key: -durations.get(key, 0.0))
+
+
+class ProgressEstimate:
+    """
+    Estimates the time remaining of a run from the audio durations of the clips: the wall time per second of audio
+    of the clips completed so far, times the audio seconds of the clips that remain.
+
+    The durations of clips that are not known are estimated by the mean known duration.
+    """
+
+    def __init__(self, keys: List[Hashable], durations: Dict[Hashable, float]):
+        known = [durations[key] for key in keys if key in durations]
+        default_duration = sum(known) / len(known) if known else 0.0
+
+        self.durations = {key: durations.get(key, default_duration) for key in keys}
+        self.total_seconds = sum(self.durations.values())
+        self.done_seconds = 0.0
+        self.start_time = time.perf_counter()
+
+    def complete(self, key: Hashable):
+        self.done_seconds += self.durations.get(key, 0.0)
+
+    def remaining_seconds(self) -> Optional[float]:
+        """
+        Get the estimated wall seconds remaining, or None before any audio was completed.
+        """
+        if self.done_seconds <= 0:
+            return None
+        elapsed = time.perf_counter() - self.start_time
+        return elapsed / self.done_seconds * (self.total_seconds - self.done_seconds)
+
+    def __str__(self) -> str:
+        remaining = self.remaining_seconds()
+        audio = f"{self.done_seconds:.0f}/{self.total_seconds:.0f} audio seconds"
+        if remaining is None:
+            return audio
+        minutes, seconds = divmod(int(remaining), 60)
+        return f"{audio}, ETA {minutes}m{seconds:02d}s"
@@ -0,0 +1,243 @@
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from math import gcd
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+import soundfile as sf
+from scipy.signal import decimate, resample_poly
+from modules.corpus_io import TsvWriter, read_tsv_rows
+from modules.transcription_engine import SAMPLING_RATE
+
+logger = logging.getLogger(__name__)
+
+# The name of the decoder of the stored clips, which is part of the keys of their cached transcriptions
+CLIP_DECODER = 'soundfile+decimate/float32'
+
+INDEX_FILE = 'index.tsv'
+SAMPLES_FILE = 'samples.f32'
+
+# Extra room reserved for every clip beyond its duration, as the decoded length may differ slightly from it
+_RESERVE_MARGIN = 0.05
+
+
+def load_speech(audio_path: str) -> Tuple[np.ndarray, int]:
+    """
+    Read a speech clip, downsampled to 16kHz to match the Musan noise files.
+
+    Returns: (speech, sampling_rate)
+    """
+    # Read speech audio (CommonVoice: 32kHz mono MP3)
+    speech, sr = sf.read(audio_path)
+
+    # Downsample from 32kHz to 16kHz to match Musan noise files
+    if sr == 32000:
+        speech = decimate(speech, 2)
+        sr = 16000
+
+    return speech, sr
+
+
+def to_transcription_audio(audio: np.ndarray, sr: int) -> np.ndarray:
+    """
+    Convert audio to the 16kHz float32 samples the transcription engine works on.
+    """
+    if sr != SAMPLING_RATE:
+        g = gcd(SAMPLING_RATE, sr)
+        audio = resample_poly(audio, SAMPLING_RATE // g, sr // g)
+    return audio.astype(np.float32)
+
+
+def decode_clip(path: str) -> np.ndarray:
+    """
+    Decode a clip to 16kHz float32 samples (Common Voice clips are downsampled from 32kHz, as in Part 4).
+    """
+    speech, sr = load_speech(path)
+    return to_transcription_audio(speech, sr)
+
+
+def _try_decode_clip(path: str) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    try:
+        return decode_clip(path), None
+    except Exception as e:
+        return None, str(e)
+
+
+def clip_name(path: str) -> str:
+    """
+    Get the filename of a clip without its directory and extension, which is its key in the store.
+    """
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class ClipStore:
+    """
+    Decoded clips (16kHz float32 samples), stored one after another in a single memory-mapped file, with an index of
+    the offset and length of every clip by its filename (without extension).
+
+    Each clip is decoded once, by build ahead of time or by load on first use, and then read as a zero-copy view of
+    the store. A store opened read-only (e.g. by worker processes) decodes the clips it doesn't have without storing
+    them. The index is flushed after the samples, so a store whose writing was interrupted is still consistent.
+    """
+
+    def __init__(self, store_dir: str, read_only: bool = False):
+        self.store_dir = store_dir
+        self.read_only = read_only
+        self._lock = threading.Lock()
+
+        self.index = {}
+        self._end = 0
+        for row in read_tsv_rows(os.path.join(store_dir, INDEX_FILE)):
+            offset, length = int(row['offset']), int(row['length'])
+            self.index[row['filename']] = (offset, length)
+            self._end = max(self._end, offset + length)
+
+        self._samples_path = os.path.join(store_dir, SAMPLES_FILE)
+        self._samples = None
+        self._writer = None
+        if not read_only:
+            os.makedirs(store_dir, exist_ok=True)
+            self._writer = TsvWriter(os.path.join(store_dir, INDEX_FILE), ['filename', 'offset', 'length'],
+                                     flush_every=1 << 30)
+        if os.path.exists(self._samples_path):
+            self._map(os.path.getsize(self._samples_path) // 4)
+
+    def _map(self, capacity: int):
+        # Map the samples file, extending it to the given capacity (in samples) if needed
+        if capacity == 0:
+            self._samples = None
+            return
+        if not self.read_only:
+            with open(self._samples_path, 'ab') as f:
+                if f.tell() < capacity * 4:
+                    f.truncate(capacity * 4)
+        self._samples = np.memmap(self._samples_path, dtype=np.float32, mode='r' if self.read_only else 'r+',
+                                  shape=(capacity,))
+
+    @property
+    def capacity(self) -> int:
+        return len(self._samples) if self._samples is not None else 0
+
+    def reserve(self, num_samples: int):
+        """
+        Make room for num_samples more samples, so the file isn't extended clip by clip.
+        """
+        with self._lock:
+            if self._end + num_samples > self.capacity:
+                self._flush_samples()
+                self._map(self._end + num_samples)
+
+    def __contains__(self, filename: str) -> bool:
+        return filename in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get(self, filename: str) -> Optional[np.ndarray]:
+        """
+        Get the samples of the given clip as a read-only view of the store, or None if it is not stored.
+        """
+        entry = self.index.get(filename)
+        if entry is None or self._samples is None or entry[0] + entry[1] > self.capacity:
+            return None
+        view = self._samples[entry[0]:entry[0] + entry[1]]
+        view.flags.writeable = False
+        return view
+
+    def add(self, filename: str, audio: np.ndarray) -> np.ndarray:
+        """
+        Store the samples of the given clip.
+
+        @return The stored samples, as a read-only view of the store.
+        """
+        with self._lock:
+            offset, length = self._end, len(audio)
+            if offset + length > self.capacity:
+                # Grow the file geometrically, so adding clips one by one takes linear time overall
+                self._flush_samples()
+                self._map(max(offset + length, int(self.capacity * 1.5)))
+            self._samples[offset:offset + length] = audio
+            self._end = offset + length
+            self.index[filename] = (offset, length)
+            self._writer.write_row({'filename': filename, 'offset': offset, 'length': length})
+        return self.get(filename)
+
+    def load(self, path: str) -> np.ndarray:
+        """
+        Get the samples of the clip at the given path, decoding (and storing) it if it is not stored yet.
+        """
+        filename = clip_name(path)
+        audio = self.get(filename)
+        if audio is None:
+            audio = decode_clip(path)
+            if not self.read_only:
+                audio = self.add(filename, audio)
+        return audio
+
+    def build(self, paths: Iterable[str], durations: Dict[str, float] = None, num_workers: int = 1) -> int:
+        """
+        Decode and store the given clips, skipping the clips that are already stored.
+
+        @param paths The paths of the clips.
+        @param durations The durations of the clips in seconds by filename (e.g. from clip_durations.tsv),
+                         used to reserve the room of all the clips at once.
+        @param num_workers The number of processes that decode the clips.
+        @return The number of clips that were decoded and stored.
+        """
+        paths = [path for path in paths if clip_name(path) not in self.index]
+        if not paths:
+            return 0
+
+        if durations:
+            total_seconds = sum(durations.get(clip_name(path), 0) for path in paths)
+            self.reserve(int(total_seconds * SAMPLING_RATE * (1 + _RESERVE_MARGIN)))
+
+        def store(decoded) -> int:
+            stored = 0
+            for path, (audio, error) in zip(paths, decoded):
+                if error is not None:
+                    logger.warning("Warning: Could not decode %s: %s", path, error)
+                    continue
+                self.add(clip_name(path), audio)
+                stored += 1
+            return stored
+
+        if num_workers <= 1:
+            stored = store(map(_try_decode_clip, paths))
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                stored = store(executor.map(_try_decode_clip, paths, chunksize=16))
+
+        self.flush()
+        return stored
+
+    def _flush_samples(self):
+        if self._samples is not None and not self.read_only:
+            self._samples.flush()
+
+    def flush(self):
+        """
+        Flush the samples and then the index to disk.
+        """
+        if self.read_only:
+            return
+        with self._lock:
+            self._flush_samples()
+            self._writer.flush()
+
+    def close(self):
+        if not self.read_only:
+            self.flush()
+            self._writer.close()
+
+
+def load_clip(audio_path: str, clip_store: Optional[ClipStore] = None) -> Tuple[np.ndarray, int]:
+    """
+    Read a speech clip from the clip store if one is given, or else decode it.
+
+    Returns: (speech, sampling_rate)
+    """
+    if clip_store is not None:
+        return clip_store.load(audio_path), SAMPLING_RATE
+    return load_speech(audio_path)
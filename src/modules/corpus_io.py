@@ -0,0 +1,145 @@
+import csv
+import io
+import os
+from typing import Dict, Iterator, List, Tuple
+import pandas as pd
+
+# The number of rows read at a time by the streaming readers
+DEFAULT_CHUNK_SIZE = 10000
+
+
+class TsvWriter:
+    """
+    Writes rows to a TSV file incrementally, flushing them to disk every flush_every rows.
+
+    The rows are quoted the same way pandas.DataFrame.to_csv(sep='\\t') quotes them, and missing values (None or
+    NaN) are written as empty fields, as pandas writes them. When appending to an existing file, a trailing partially
+    written line (e.g. of a run that crashed while writing it) is removed first, and the header is written only if
+    the file is empty.
+    """
+
+    def __init__(self, filename: str, columns: List[str], append: bool = True, flush_every: int = 10):
+        self.filename = filename
+        self.columns = columns
+        self.flush_every = flush_every
+        self._unflushed = 0
+
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if append:
+            _truncate_partial_line(filename)
+        self._file = open(filename, 'a' if append else 'w', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file, delimiter='\t', lineterminator='\n')
+
+        if self._file.tell() == 0:
+            self._writer.writerow(columns)
+            self._file.flush()
+
+    def write_row(self, row: Dict):
+        self._writer.writerow(['' if _is_missing(row.get(column)) else row[column] for column in self.columns])
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unflushed = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> 'TsvWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _truncate_partial_line(filename: str, block_size: int = 65536):
+    # Truncate the file after its last newline, dropping a partially written last line (the whole file if it has no
+    # complete line). The file is scanned backwards from its end, so only the partial line is read.
+    if not os.path.exists(filename):
+        return
+    with open(filename, 'r+b') as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - block_size)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b'\n')
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            f.truncate(position)
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def read_tsv_chunks(filename: str, columns: List[str], chunk_size: int = DEFAULT_CHUNK_SIZE
+                    ) -> Iterator[List[Tuple]]:
+    """
+    Stream the given columns of a TSV file (e.g. a Common Voice test.tsv or validated.tsv, or a transcriptions file)
+    in chunks of chunk_size rows, so files of any size are read in flat memory.
+
+    The values are parsed the same way pandas.read_csv(sep='\\t') parses text columns: quoted fields are unquoted,
+    and empty fields are NaN. All the other values are kept as strings.
+
+    @param filename The TSV file to read.
+    @param columns The columns to read, which are the fields of the row tuples in this order.
+    @param chunk_size The number of rows of every chunk.
+    @return Lists of row tuples.
+    """
+    reader = pd.read_csv(filename, sep='\t', usecols=columns, dtype=str, chunksize=chunk_size)
+    with reader:
+        for chunk in reader:
+            yield list(chunk[columns].itertuples(index=False, name=None))
+
+
+def iter_tsv_rows(filename: str, columns: List[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple]:
+    """
+    Stream the given columns of a TSV file row by row (read in chunks, as by read_tsv_chunks).
+    """
+    for chunk in read_tsv_chunks(filename, columns, chunk_size):
+        yield from chunk
+
+
+def read_tsv_rows(filename: str) -> List[Dict[str, str]]:
+    """
+    Read the rows of a TSV file written by TsvWriter (or pandas), skipping a trailing partially written line,
+    e.g. of a run that crashed while writing it.
+
+    @param filename The TSV file to read.
+    @return The rows as dictionaries from column names to values, or an empty list if the file does not exist.
+    """
+    if not os.path.exists(filename):
+        return []
+
+    with open(filename, 'r', encoding='utf-8', newline='') as f:
+        content = f.read()
+
+    # Drop the last line if it was not completely written
+    if not content.endswith('\n'):
+        content = content[:content.rfind('\n') + 1]
+
+    return list(csv.DictReader(io.StringIO(content, newline=''), delimiter='\t'))
+
+
+def read_clip_durations(filename: str) -> Dict[str, float]:
+    """
+    Read the durations of the clips of a Common Voice corpus (its clip_durations.tsv file).
+
+    @param filename The clip durations file.
+    @return The duration of every clip in seconds, by the clip's filename without extension, or an empty dictionary
+            if the file does not exist.
+    """
+    return {os.path.splitext(row['clip'])[0]: int(row['duration[ms]']) / 1000
+            for row in read_tsv_rows(filename)}
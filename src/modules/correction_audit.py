@@ -0,0 +1,61 @@
+from collections import Counter
+from typing import List, Optional, Tuple
+from modules.corpus_io import TsvWriter
+
+AUDIT_COLUMNS = ['row', 'type_of_text', 'step', 'old', 'new']
+
+# A correction made by a normalization step to a text: (step, old, new), where new is '' if the old word was removed
+Correction = Tuple[str, str, str]
+
+# A correction event: (row, type_of_text, step, old, new), e.g. a correction of the 'Reference' text of a row
+CorrectionEvent = Tuple[Optional[int], str, str, str, str]
+
+
+class CorrectionAudit:
+    """
+    Records the corrections made by the normalization steps (e.g. a correction dictionary replacing a word, or the
+    spell checker correcting an OOV word) as (row, type_of_text, step, old, new) events.
+
+    The audit file is rewritten when the audit is created, so it only holds the events of the current run. The events
+    are buffered and written to it in bulk, every flush_every events. Without an audit file, only the number of
+    events of every step is kept.
+    """
+
+    def __init__(self, filename: str = None, flush_every: int = 10000):
+        self.filename = filename
+        self.flush_every = flush_every
+        self.counts = Counter()
+        self._events: List[CorrectionEvent] = []
+        self._writer = None
+        if filename is not None:
+            self._writer = TsvWriter(filename, AUDIT_COLUMNS, append=False, flush_every=flush_every)
+
+    def record(self, row: Optional[int], type_of_text: str, step: str, old: str, new: str):
+        self.counts[step] += 1
+        if self.filename is None:
+            return
+        self._events.append((row, type_of_text, step, old, new))
+        if len(self._events) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered events to the audit file (appending to it if the audit was closed before).
+        """
+        if self.filename is None or not self._events:
+            return
+        if self._writer is None:
+            self._writer = TsvWriter(self.filename, AUDIT_COLUMNS, append=True, flush_every=self.flush_every)
+        for event in self._events:
+            self._writer.write_row(dict(zip(AUDIT_COLUMNS, event)))
+        self._writer.flush()
+        self._events = []
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def stats(self) -> dict:
+        return dict(self.counts)
@@ -0,0 +1,182 @@
+from typing import Callable, Dict, Optional, Tuple
+
+# Marks the end of a pattern in a trie node
+_END = ''
+
+
+# The default replacement callback of CompiledCorrections.apply
+def _ignore_replacement(old_word: str, new_word: str):
+    pass
+
+
+class SuffixIndex:
+    """
+    A trie of reversed patterns, finding the first pattern (by priority) that a word ends with in O(len(word)).
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, pattern: str, priority: int):
+        node = self.root
+        for char in reversed(pattern):
+            node = node.setdefault(char, {})
+        node[_END] = min(node.get(_END, priority), priority)
+
+    def first_match(self, word: str) -> Optional[int]:
+        """
+        Get the lowest priority of the patterns that the given word ends with, or None if there is no such pattern.
+        """
+        node = self.root
+        best = node.get(_END)
+        for char in reversed(word):
+            node = node.get(char)
+            if node is None:
+                break
+            priority = node.get(_END)
+            if priority is not None and (best is None or priority < best):
+                best = priority
+        return best
+
+
+class CompiledCorrections:
+    """
+    A correction dictionary compiled for fast lookups, applying the same rules as the linear scan over the dictionary.
+
+    Single-word errors are matched by a suffix index (or an exact-match hash lookup when checking absolute equality).
+    For a pair of consecutive words, each multi-word rule checks the correction and then the error against the end
+    of the pair "current next". Since the words have no spaces, a pattern without spaces matches if the next word
+    ends with it, and a pattern "a b" (b without spaces) matches if the next word is b and the current word ends
+    with a. These checks are indexed by the next word, and the rule that comes first in the dictionary wins.
+    """
+
+    def __init__(self, error_dict: Dict[str, str], check_absolute_equality: bool = False):
+        self.check_absolute_equality = check_absolute_equality
+
+        # Separate single-word and multi-word errors, keeping their order in the dictionary
+        self.errors_one_word = [(error, correction) for error, correction in error_dict.items() if ' ' not in error]
+        self.errors_two_words = [(error, correction) for error, correction in error_dict.items() if ' ' in error]
+
+        # Single-word errors: exact matches or suffixes
+        self.one_word_exact = {}
+        self.one_word_suffixes = SuffixIndex()
+        for priority, (error, _) in enumerate(self.errors_one_word):
+            self.one_word_exact.setdefault(error, priority)
+            self.one_word_suffixes.add(error, priority)
+
+        # Multi-word rules: the priority of the correction check of the k'th rule is 2k, and of its error check 2k+1
+        self.two_words_exact = {}
+        self.two_words_next_suffixes = SuffixIndex()
+        self.two_words_by_next = {}
+        for k, (error, correction) in enumerate(self.errors_two_words):
+            for priority, pattern in ((2 * k, correction), (2 * k + 1, error)):
+                if pattern.count(' ') == 1:
+                    self.two_words_exact.setdefault(tuple(pattern.split(' ')), priority)
+
+                if ' ' not in pattern:
+                    self.two_words_next_suffixes.add(pattern, priority)
+                else:
+                    current_suffix, next_word = pattern.rsplit(' ', 1)
+                    if ' ' not in current_suffix:
+                        self.two_words_by_next.setdefault(next_word, []).append((priority, current_suffix))
+
+    def _match_one_word(self, word: str) -> Optional[Tuple[str, str]]:
+        if self.check_absolute_equality:
+            priority = self.one_word_exact.get(word)
+        else:
+            priority = self.one_word_suffixes.first_match(word)
+        return self.errors_one_word[priority] if priority is not None else None
+
+    def _match_two_words(self, current_word: str, next_word: str) -> Optional[int]:
+        if self.check_absolute_equality:
+            return self.two_words_exact.get((current_word, next_word))
+
+        best = self.two_words_next_suffixes.first_match(next_word)
+        for priority, current_suffix in self.two_words_by_next.get(next_word, ()):
+            if best is not None and priority > best:
+                break
+            if current_word.endswith(current_suffix):
+                best = priority
+                break
+        return best
+
+    def _correct_one_word(self, word: str) -> str:
+        match = self._match_one_word(word)
+        if match is not None:
+            error, correction = match
+            word = word.replace(error, correction)
+        return word
+
+    def apply(self, text: str, on_replace: Optional[Callable[[str, str], None]] = None) -> str:
+        """
+        Replace the errors in the given text with their corrections.
+
+        @param on_replace Called with the old and the new word of every replacement (the new word is '' if the old
+                          word was removed).
+        """
+        if on_replace is None:
+            on_replace = _ignore_replacement
+
+        words = text.split()
+        new_text = []
+
+        # Flag to skip the current word if it is an error and the correction is a multi-word error
+        skip = False
+
+        # Iterate over the words in the text
+        for current_word, next_word in zip(words, words[1:]):
+
+            # Save the original word for reporting the replacement
+            old_word = current_word
+
+            # If the skip flag is True, skip the current word and report the replacement
+            if skip:
+                skip = False
+                on_replace(old_word, '')
+                continue
+
+            # Find the first multi-word rule whose correction or error matches the current and the next word
+            priority = self._match_two_words(current_word, next_word)
+            if priority is not None:
+                error, correction = self.errors_two_words[priority // 2]
+                skip = True
+
+                if priority % 2 == 0:
+                    # The words already match the correction, keep them as they are
+                    current_word = current_word + ' ' + next_word
+                elif len(correction.split()) == 1:
+                    current_word = current_word.replace(error.split()[0], correction)
+                else:
+                    current_word = current_word.replace(error.split()[0], correction.split()[0])
+                    next_word = next_word.replace(error.split()[1], correction.split()[1])
+                    current_word = current_word + ' ' + next_word
+
+            # Handle the single-word errors in case no multi-word error was found
+            if not skip:
+                current_word = self._correct_one_word(current_word)
+
+            # If the original word is not the same as the current word, report the replacement
+            if old_word != current_word:
+                on_replace(old_word, current_word)
+
+            # Add the current word to the new text
+            new_text.append(current_word)
+
+        # Save the last word for reporting the replacement
+        old_word = words[-1]
+
+        # If the skip flag is False, handle the last word
+        if not skip:
+            current_word = self._correct_one_word(old_word)
+
+            # If the original word is not the same as the current word, report the replacement
+            if old_word != current_word:
+                on_replace(old_word, current_word)
+            new_text.append(current_word)
+        else:
+            # If the skip flag is True, report the replacement
+            on_replace(old_word, '')
+
+        # Return the new text as a single string
+        return ' '.join(new_text)
+
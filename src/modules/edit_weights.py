@@ -1,3 +1,9 @@
+from modules.lru_cache import LRUCache
+
+# Cache of the character-level alignment scores of word pairs, shared by all the NestedUniformWeights objects in the
+# process. The same word pairs recur across a corpus, so each of them is aligned only once.
+PAIR_WEIGHT_CACHE = LRUCache(max_size=500000)
+
 class EditWeights:
     """
     Abstract base class for classes providing edit weights for sequence alignment operations.
@@ -67,7 +73,10 @@ class NestedUniformWeights(GeneralEditWeights):
             return self.match_weight * len(first_obj)
         else:
             from modules.align_sequences import align_sequences
-            return align_sequences(first_obj, second_obj, UniformWeights())[0]
+            return PAIR_WEIGHT_CACHE.get_or_compute(
+                (first_obj, second_obj),
+                lambda: float(align_sequences(first_obj, second_obj, UniformWeights())[0])
+            )
     
     def insertion_weight(self, obj) -> float:
         return self.insdel_weight * len(obj)
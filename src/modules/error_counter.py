@@ -0,0 +1,110 @@
+import heapq
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+# An error of an alignment: (reference word, transcribed word), where a missing word is ''
+ErrorPair = Tuple[str, str]
+
+
+class ErrorCounter:
+    """
+    A running count of error pairs, which can be merged with the counters of other shards, and queried for the k
+    most frequent errors with a heap instead of sorting all of them.
+
+    By default the counts are exact. If a capacity is given, at most capacity pairs are tracked with the
+    Space-Saving algorithm: a new pair replaces the pair with the minimal count and inherits its count, so the count
+    of every tracked pair overestimates its true count by at most the minimal count (total / capacity), and every
+    pair more frequent than that is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        if capacity is not None and capacity < 1:
+            raise ValueError(f"The capacity of an error counter must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.counts = Counter()
+        self.total = 0
+
+        # Space-Saving: a min-heap of (count, order, pair) entries. Entries whose count is out of date are skipped
+        # when they reach the top, and the heap is rebuilt when too many of them pile up.
+        self._heap = []
+        self._order = 0
+
+    @property
+    def approximate(self) -> bool:
+        return self.capacity is not None
+
+    def add(self, pair: ErrorPair, count: int = 1):
+        self.total += count
+        if not self.approximate or pair in self.counts or len(self.counts) < self.capacity:
+            self.counts[pair] += count
+        else:
+            # Replace the pair with the minimal count
+            min_count, min_pair = self._pop_min()
+            del self.counts[min_pair]
+            self.counts[pair] = min_count + count
+
+        if self.approximate:
+            self._push(pair)
+
+    def update(self, pairs: Iterable[ErrorPair]):
+        """
+        Count every pair of the given pairs.
+        """
+        if not self.approximate:
+            counts = Counter(pairs)
+            self.counts.update(counts)
+            self.total += sum(counts.values())
+            return
+        for pair in pairs:
+            self.add(pair)
+
+    def merge(self, other: 'ErrorCounter') -> 'ErrorCounter':
+        """
+        Add the counts of another counter (e.g. of another shard) to this one.
+        """
+        if not self.approximate:
+            self.counts.update(other.counts)
+            self.total += other.total
+            return self
+
+        # Merge the two summaries, and keep the capacity pairs with the largest counts
+        merged = self.counts + other.counts
+        self.counts = Counter(dict(heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1])))
+        self.total += other.total
+        self._rebuild()
+        return self
+
+    def __iadd__(self, other: 'ErrorCounter') -> 'ErrorCounter':
+        return self.merge(other)
+
+    def most_common(self, k: int = 0) -> List[Tuple[ErrorPair, int]]:
+        """
+        Get the k most frequent errors (all of them if k is 0) and their counts, in decreasing order of count.
+        Errors with equal counts are in the order they were first counted.
+        """
+        if k == 0 or k >= len(self.counts):
+            return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(k, self.counts.items(), key=lambda item: item[1])
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _push(self, pair: Hashable):
+        self._order += 1
+        heapq.heappush(self._heap, (self.counts[pair], self._order, pair))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild()
+
+    def _pop_min(self) -> Tuple[int, Hashable]:
+        while True:
+            count, _, pair = heapq.heappop(self._heap)
+            if self.counts.get(pair) == count:
+                return count, pair
+
+    def _rebuild(self):
+        self._heap = [(count, order, pair) for order, (pair, count) in enumerate(self.counts.items())]
+        heapq.heapify(self._heap)
+        self._order = len(self._heap)
+
+    def stats(self) -> Dict[str, int]:
+        return {'pairs': len(self.counts), 'errors': self.total, 'capacity': self.capacity}
@@ -0,0 +1,201 @@
+import atexit
+import cProfile
+import functools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+# Environment variables that enable the instrumentation of a run: the JSON file of the run summary, and the file of
+# the cProfile statistics of the whole run (e.g. for snakeviz or pstats)
+TIMINGS_ENV = 'SPEECHREC_TIMINGS'
+PROFILE_ENV = 'SPEECHREC_PROFILE'
+
+# The process that saves the results, set when the instrumentation is enabled
+_OWNER_PID_ENV = 'SPEECHREC_INSTRUMENTATION_PID'
+
+
+class _StageStats:
+    # The timings of a stage: exact count, total and maximum, and a bounded random sample of the durations for the
+    # percentiles (reservoir sampling), so the memory doesn't grow with the number of calls
+    __slots__ = ('calls', 'total', 'max', 'samples')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self, seconds: float, max_samples: int, rng: random.Random):
+        self.calls += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self.samples) < max_samples:
+            self.samples.append(seconds)
+        else:
+            i = rng.randrange(self.calls)
+            if i < max_samples:
+                self.samples[i] = seconds
+
+    def percentile(self, q: float) -> float:
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(q / 100 * len(samples)))] if samples else 0.0
+
+
+class Instrumentation:
+    """
+    Per-stage timers and counters of a run, aggregated into a summary (calls, total, mean, p95 and max per stage)
+    that can be printed or saved as JSON.
+
+    It is disabled by default, and then the timers do nothing but check a flag. The stages of nested calls are timed
+    inclusively (e.g. a normalization step includes the steps it calls). Each process has its own timings, so the
+    stages that run in worker processes are not included in the summary of the main process.
+    """
+
+    def __init__(self, enabled: bool = False, max_samples: int = 10000):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self.stages: Dict[str, _StageStats] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self._profiler = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def record(self, stage: str, seconds: float):
+        """
+        Record a duration of the given stage.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = _StageStats()
+            stats.add(seconds, self.max_samples, self._rng)
+
+    def count(self, counter: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    @contextmanager
+    def stage(self, stage: str):
+        """
+        Time the enclosed block as the given stage.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def timed(self, stage: str) -> Callable:
+        """
+        Decorate a function so every call to it is timed as the given stage.
+        """
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def summary(self) -> dict:
+        """
+        Get the summary of the run: the timings of every stage (in seconds) and the counters.
+        """
+        with self._lock:
+            stages = {
+                stage: {
+                    'calls': stats.calls,
+                    'total': stats.total,
+                    'mean': stats.total / stats.calls,
+                    'p95': stats.percentile(95),
+                    'max': stats.max
+                }
+                for stage, stats in sorted(self.stages.items(), key=lambda item: item[1].total, reverse=True)
+            }
+            return {'stages': stages, 'counters': dict(self.counters)}
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"{'stage':<40}{'calls':>10}{'total (s)':>12}{'mean (ms)':>12}{'p95 (ms)':>12}{'max (ms)':>12}")
+        for stage, stats in summary['stages'].items():
+            print(f"{stage:<40}{stats['calls']:>10}{stats['total']:>12.3f}{stats['mean'] * 1000:>12.3f}"
+                  f"{stats['p95'] * 1000:>12.3f}{stats['max'] * 1000:>12.3f}")
+        for counter, value in summary['counters'].items():
+            print(f"{counter:<40}{value:>10}")
+
+    def save(self, filename: str):
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+
+    def start_profile(self):
+        """
+        Profile the whole process with cProfile, until stop_profile is called.
+        """
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def stop_profile(self, filename: str):
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(filename)
+            self._profiler = None
+
+    def enable_from_env(self):
+        """
+        Enable the instrumentation if TIMINGS_ENV or PROFILE_ENV is set, and print and save its results when the
+        process exits. Only the process that first enabled it saves them, not its worker processes (which inherit
+        the environment).
+        """
+        timings_file = os.environ.get(TIMINGS_ENV)
+        profile_file = os.environ.get(PROFILE_ENV)
+        if not timings_file and not profile_file:
+            return
+        owner_pid = int(os.environ.setdefault(_OWNER_PID_ENV, str(os.getpid())))
+
+        if timings_file:
+            self.enable()
+
+            def save_timings():
+                if os.getpid() == owner_pid:
+                    self.print_summary()
+                    self.save(timings_file)
+            atexit.register(save_timings)
+
+        if profile_file and os.getpid() == owner_pid:
+            self.start_profile()
+            atexit.register(self.stop_profile, profile_file)
+
+
+# The instrumentation of the process, enabled by the environment variables
+INSTRUMENTATION = Instrumentation()
+INSTRUMENTATION.enable_from_env()
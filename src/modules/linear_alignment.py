@@ -0,0 +1,265 @@
+from typing import List, Sequence, Tuple
+import numpy as np
+from modules.align_sequences import align_sequences
+from modules.edit_weights import EditWeights
+from modules.wavefront_alignment import MIN_WAVEFRONT_CELLS, supports_weights, encode_sequences
+
+# Sub-problems up to this number of matrix cells are aligned directly with the quadratic-memory alignment.
+MAX_DIRECT_CELLS = 4096
+
+
+def _score_counts_wavefront(first_ids: np.ndarray,
+                            second_ids: np.ndarray,
+                            weights: EditWeights) -> Tuple[float, int, int, int, int]:
+    # Same as align_score_counts, but with constant weights the entries are computed one anti-diagonal at a time, as in
+    # modules.wavefront_alignment. Only the last two anti-diagonals are kept, indexed by the row of their entries.
+    first_len = len(first_ids)
+    second_len = len(second_ids)
+
+    match_wgt = float(weights.match_weight)
+    subst_wgt = float(weights.substitution_weight)
+    insdel_wgt = float(weights.insdel_weight)
+
+    # Rotating buffers of the scores and the (M, S, I, D) counts of the anti-diagonals d-2, d-1 and d.
+    scores = [np.zeros(first_len + 1) for _ in range(3)]
+    counts = [np.zeros((4, first_len + 1), dtype=np.int64) for _ in range(3)]
+
+    for diag in range(1, first_len + second_len + 1):
+        scores_2, scores_1, scores_0 = scores
+        counts_2, counts_1, counts_0 = counts
+
+        # The 0'th row and column correspond to insertions and deletions only.
+        if diag <= second_len:
+            scores_0[0] = scores_1[0] + insdel_wgt
+            counts_0[:, 0] = counts_1[:, 0]
+            counts_0[2, 0] += 1
+        if diag <= first_len:
+            scores_0[diag] = scores_1[diag - 1] + insdel_wgt
+            counts_0[:, diag] = counts_1[:, diag - 1]
+            counts_0[3, diag] += 1
+
+        first_row = max(1, diag - second_len)
+        last_row = min(first_len, diag - 1)
+        if first_row <= last_row:
+            rows = np.arange(first_row, last_row + 1)
+            is_match = first_ids[rows - 1] == second_ids[diag - rows - 1]
+
+            # Pair operation, from the entry of the previous row on the anti-diagonal d-2.
+            max_wgt = scores_2[rows - 1] + np.where(is_match, match_wgt, subst_wgt)
+            best_counts = counts_2[:, rows - 1]
+            best_counts[0] += is_match
+            best_counts[1] += ~is_match
+
+            # Insertion operation, from the entry of the same row on the anti-diagonal d-1.
+            ins_wgt = scores_1[rows] + insdel_wgt
+            is_better = ins_wgt > max_wgt
+            max_wgt = np.where(is_better, ins_wgt, max_wgt)
+            best_counts[:, is_better] = counts_1[:, rows[is_better]]
+            best_counts[2, is_better] += 1
+
+            # Deletion operation, from the entry of the previous row on the anti-diagonal d-1.
+            del_wgt = scores_1[rows - 1] + insdel_wgt
+            is_better = del_wgt > max_wgt
+            max_wgt = np.where(is_better, del_wgt, max_wgt)
+            best_counts[:, is_better] = counts_1[:, rows[is_better] - 1]
+            best_counts[3, is_better] += 1
+
+            scores_0[rows] = max_wgt
+            counts_0[:, rows] = best_counts
+
+        scores = [scores_1, scores_0, scores_2]
+        counts = [counts_1, counts_0, counts_2]
+
+    # The last computed anti-diagonal is now in the middle buffer.
+    m, s, i, d = (int(count) for count in counts[1][:, first_len])
+    return scores[1][first_len], m, s, i, d
+
+
+def align_score_counts(first_seq: Sequence,
+                       second_seq: Sequence,
+                       weights: EditWeights) -> Tuple[float, int, int, int, int]:
+    """
+    Compute the score of the optimal global alignment and its edit operation counts, without recovering the pairs.
+
+    Only two rows of the alignment matrix are kept, each entry holding its score and the counts of the operations
+    on its optimal path, so this function takes O(mn) time but only O(n) memory. The operations are compared in the
+    same order as in align_sequences, so the counts are those of the alignment align_sequences returns.
+    For the constant-weight classes the entries are computed on vectorized anti-diagonals instead of rows.
+
+    @param first_seq The first sequence of aligned objects.
+    @param second_seq The second sequence of aligned objects.
+    @param weights The edit weights.
+    @return The computed score of the optimal global alignment.
+    @return The number of matches, substitutions, insertions and deletions of the optimal alignment.
+    """
+    if supports_weights(weights) and len(first_seq) * len(second_seq) >= MIN_WAVEFRONT_CELLS:
+        encoded = encode_sequences(first_seq, second_seq)
+        if encoded is not None:
+            return _score_counts_wavefront(encoded[0], encoded[1], weights)
+
+    pair_weight = weights.pair_weight
+    insertion_weight = weights.insertion_weight
+    deletion_weight = weights.deletion_weight
+
+    # Each entry of a row is a (score, M, S, I, D) tuple. Fill the 0'th row with insertions.
+    prev_row = [(0.0, 0, 0, 0, 0)]
+    for second_obj in second_seq:
+        score, m, s, i, d = prev_row[-1]
+        prev_row.append((score + insertion_weight(second_obj), m, s, i + 1, d))
+
+    for first_obj in first_seq:
+        # The 0'th column corresponds to the deletion of the objects in the first sequence.
+        del_wgt = deletion_weight(first_obj)
+        score, m, s, i, d = prev_row[0]
+        curr_row = [(score + del_wgt, m, s, i, d + 1)]
+
+        for j, second_obj in enumerate(second_seq, start=1):
+            # Pair operation: a match if the objects are equal, otherwise a substitution.
+            score, m, s, i, d = prev_row[j - 1]
+            max_wgt = score + pair_weight(first_obj, second_obj)
+            if first_obj == second_obj:
+                best = (max_wgt, m + 1, s, i, d)
+            else:
+                best = (max_wgt, m, s + 1, i, d)
+
+            # Insertion operation, from the previous entry in the same row.
+            score, m, s, i, d = curr_row[j - 1]
+            ins_wgt = score + insertion_weight(second_obj)
+            if ins_wgt > max_wgt:
+                max_wgt = ins_wgt
+                best = (ins_wgt, m, s, i + 1, d)
+
+            # Deletion operation, from the entry in the same column of the previous row.
+            score, m, s, i, d = prev_row[j]
+            del_wgt_total = score + del_wgt
+            if del_wgt_total > max_wgt:
+                best = (del_wgt_total, m, s, i, d + 1)
+
+            curr_row.append(best)
+
+        prev_row = curr_row
+
+    return prev_row[-1]
+
+
+def _last_row_scores_vectorized(first_ids: np.ndarray, second_ids: np.ndarray, weights: EditWeights) -> np.ndarray:
+    # With constant weights, the best path into entry j of a row that ends with insertions starts from some entry k <= j
+    # of the row, whose score is taken from the pair or deletion operation: row[j] = max_k(base[k] + (j - k) * ins).
+    # Shifting by j * ins turns this into a running maximum, so each row is computed with a few vectorized operations.
+    match_wgt = float(weights.match_weight)
+    subst_wgt = float(weights.substitution_weight)
+    insdel_wgt = float(weights.insdel_weight)
+
+    shifts = np.arange(len(second_ids) + 1) * insdel_wgt
+    prev_row = shifts.copy()
+
+    for first_id in first_ids:
+        base = np.empty_like(prev_row)
+        base[0] = prev_row[0] + insdel_wgt
+        base[1:] = np.maximum(prev_row[:-1] + np.where(second_ids == first_id, match_wgt, subst_wgt),
+                              prev_row[1:] + insdel_wgt)
+        prev_row = np.maximum.accumulate(base - shifts) + shifts
+
+    return prev_row
+
+
+def _last_row_scores(first_seq: Sequence, second_seq: Sequence, weights: EditWeights) -> List[float]:
+    # Compute the scores of aligning the whole first sequence with every prefix of the second sequence.
+    if supports_weights(weights):
+        encoded = encode_sequences(first_seq, second_seq)
+        if encoded is not None:
+            return _last_row_scores_vectorized(encoded[0], encoded[1], weights).tolist()
+
+    pair_weight = weights.pair_weight
+    insertion_weight = weights.insertion_weight
+    deletion_weight = weights.deletion_weight
+
+    prev_row = [0.0]
+    for second_obj in second_seq:
+        prev_row.append(prev_row[-1] + insertion_weight(second_obj))
+
+    for first_obj in first_seq:
+        del_wgt = deletion_weight(first_obj)
+        curr_row = [prev_row[0] + del_wgt]
+        for j, second_obj in enumerate(second_seq, start=1):
+            max_wgt = prev_row[j - 1] + pair_weight(first_obj, second_obj)
+            ins_wgt = curr_row[j - 1] + insertion_weight(second_obj)
+            if ins_wgt > max_wgt:
+                max_wgt = ins_wgt
+            if prev_row[j] + del_wgt > max_wgt:
+                max_wgt = prev_row[j] + del_wgt
+            curr_row.append(max_wgt)
+        prev_row = curr_row
+
+    return prev_row
+
+
+def _split_point(first_seq: Sequence, second_seq: Sequence, weights: EditWeights) -> Tuple[int, int, float]:
+    # Find where an optimal alignment path crosses the middle row of the first sequence (Hirschberg's algorithm).
+    mid = len(first_seq) // 2
+    forward_scores = _last_row_scores(first_seq[:mid], second_seq, weights)
+    backward_scores = _last_row_scores(first_seq[mid:][::-1], second_seq[::-1], weights)
+
+    second_len = len(second_seq)
+    best_split = 0
+    best_score = forward_scores[0] + backward_scores[second_len]
+    for k in range(1, second_len + 1):
+        score = forward_scores[k] + backward_scores[second_len - k]
+        if score > best_score:
+            best_split = k
+            best_score = score
+
+    return mid, best_split, best_score
+
+
+def align_sequences_linear(first_seq: Sequence,
+                           second_seq: Sequence,
+                           weights: EditWeights) -> Tuple[float, List[Tuple]]:
+    """
+    Perform global alignment between the two given sequences in linear memory, using Hirschberg's divide-and-conquer
+    algorithm.
+
+    The first sequence is split in the middle, the column where an optimal path crosses the split is found from a
+    forward and a backward pass of linear memory, and the two halves are aligned recursively. This function takes
+    O(mn) time (about twice the work of align_sequences) and O(m + n) memory, so it can align long-form transcripts.
+    For the constant-weight classes the rows are computed with vectorized running maxima.
+
+    The returned alignment has the optimal score, but when several alignments are optimal it may resolve the ties
+    differently than align_sequences.
+
+    @param first_seq The first sequence of aligned objects.
+    @param second_seq The second sequence of aligned objects.
+    @param weights The edit weights.
+    @return The computed score of the optimal global alignment.
+    @return An output list of the aligned object pairs, in the same format as align_sequences.
+    """
+    first_seq = list(first_seq)
+    second_seq = list(second_seq)
+
+    aligned_pairs = []
+    score = None
+
+    # Solve the sub-problems in order from left to right with an explicit stack, each one either directly or by
+    # splitting it in two.
+    stack = [(0, len(first_seq), 0, len(second_seq))]
+    while stack:
+        first_start, first_end, second_start, second_end = stack.pop()
+        first_part = first_seq[first_start:first_end]
+        second_part = second_seq[second_start:second_end]
+
+        if len(first_part) <= 1 or len(first_part) * len(second_part) <= MAX_DIRECT_CELLS:
+            part_score, part_pairs = align_sequences(first_part, second_part, weights)
+            aligned_pairs.extend(part_pairs)
+            if score is None:
+                score = part_score
+            continue
+
+        mid, split, split_score = _split_point(first_part, second_part, weights)
+        if score is None:
+            score = split_score
+
+        # Push the right half first, so the left half is aligned first.
+        stack.append((first_start + mid, first_end, second_start + split, second_end))
+        stack.append((first_start, first_start + mid, second_start, second_start + split))
+
+    return score, aligned_pairs
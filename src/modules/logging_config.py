@@ -0,0 +1,93 @@
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict
+
+# Environment variables of the logging: the level of all the modules, the levels of specific modules (e.g.
+# "modules.normalize_text=DEBUG,modules.correction_rules=WARNING"), and the maximal messages per second of a module
+LOG_LEVEL_ENV = 'SPEECHREC_LOG_LEVEL'
+LOG_MODULES_ENV = 'SPEECHREC_LOG_MODULES'
+LOG_RATE_ENV = 'SPEECHREC_LOG_RATE'
+
+DEFAULT_LEVEL = 'INFO'
+DEFAULT_RATE = 50.0
+
+# The parent logger of the modules (each module logs to logging.getLogger(__name__))
+ROOT_LOGGER = 'modules'
+
+# The handler added by configure_logging
+_handler = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limits the messages of every logger to rate messages per second on average, allowing bursts of up to burst
+    messages (a token bucket per logger). The number of messages dropped is added to the next message that passes.
+    Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate * 2))
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate <= 0:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, dropped = self._buckets.get(record.name, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[record.name] = (tokens, now, dropped + 1)
+                return False
+            self._buckets[record.name] = (tokens - 1, now, 0)
+
+        if dropped > 0:
+            record.msg = f"{record.getMessage()} ({dropped} messages dropped by the rate limit)"
+            record.args = None
+        return True
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """
+    Parse module levels of the form "module=LEVEL,module=LEVEL".
+    """
+    levels = {}
+    for item in spec.split(','):
+        if '=' in item:
+            module, level = item.split('=', 1)
+            levels[module.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: str = None, module_levels: Dict[str, str] = None, rate: float = None):
+    """
+    Log the messages of the project to stdout, at the given level (by default from LOG_LEVEL_ENV, or INFO), with the
+    given levels of specific modules (added to the ones of LOG_MODULES_ENV), and limited to rate messages per second
+    per module (by default from LOG_RATE_ENV; 0 disables the limit). Configuring the logging again replaces the
+    previous configuration.
+    """
+    level = (level or os.environ.get(LOG_LEVEL_ENV) or DEFAULT_LEVEL).upper()
+    module_levels = {**parse_module_levels(os.environ.get(LOG_MODULES_ENV, '')), **(module_levels or {})}
+    rate = rate if rate is not None else float(os.environ.get(LOG_RATE_ENV, DEFAULT_RATE))
+
+    global _handler
+    logger = logging.getLogger(ROOT_LOGGER)
+    if _handler is not None:
+        logger.removeHandler(_handler)
+
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    _handler.addFilter(RateLimitFilter(rate))
+    logger.addHandler(_handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    for module, module_level in module_levels.items():
+        logging.getLogger(module).setLevel(module_level)
@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, List, Tuple
+
+
+class LRUCache:
+    """
+    A bounded, thread-safe mapping that evicts the least recently used entry once it is full.
+
+    The cache counts its hits and misses, and can be persisted to (and restored from) a JSON file so that
+    repeated runs start warm. Keys must be strings, numbers or tuples of those, and values must be JSON-serializable.
+
+    The entries put into the cache can also be tracked, so that a copy of the cache (e.g. in a worker process) can
+    send the entries it computed back to the original cache.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._new_entries = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get the cached value of the given key and mark it as the most recently used one.
+
+        @param key The key to look up.
+        @param default The value to return if the key is not cached.
+        @return The cached value, or the default value.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Cache the given value, evicting the least recently used entries if the cache is full.
+
+        @param key The key to cache.
+        @param value The value to cache.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            if self._new_entries is not None:
+                self._new_entries[key] = value
+
+    def update(self, entries: Iterable[Tuple[Hashable, Any]]):
+        """
+        Cache the given (key, value) entries, e.g. the new entries of a copy of the cache.
+        """
+        for key, value in entries:
+            self.put(key, value)
+
+    def track_new_entries(self):
+        """
+        Start tracking the entries put into the cache, until they are taken by take_new_entries.
+        """
+        with self._lock:
+            self._new_entries = {}
+
+    def take_new_entries(self) -> List[Tuple[Hashable, Any]]:
+        """
+        Take the (key, value) entries put into the cache since tracking started or since the previous call.
+        """
+        with self._lock:
+            if self._new_entries is None:
+                return []
+            entries = list(self._new_entries.items())
+            self._new_entries = {}
+            return entries
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Get the cached value of the given key, computing and caching it on a miss.
+
+        The value is computed outside of the lock, so two threads missing the same key may both compute it.
+
+        @param key The key to look up.
+        @param compute A function with no arguments computing the value.
+        @return The cached or the computed value.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total > 0 else 0
+        }
+
+    def save(self, filename: str):
+        """
+        Save the cached entries to a JSON file, from the least to the most recently used one.
+
+        @param filename The JSON file to write.
+        """
+        with self._lock:
+            entries = [[list(key) if isinstance(key, tuple) else key, value] for key, value in self._entries.items()]
+
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file first, so an interrupted run never leaves a truncated cache behind.
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_filename, filename)
+
+    def load(self, filename: str) -> bool:
+        """
+        Load cached entries from a JSON file written by save(), if it exists.
+
+        @param filename The JSON file to read.
+        @return True if the file was loaded.
+        """
+        if not os.path.exists(filename):
+            return False
+
+        with open(filename, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+
+        for key, value in entries:
+            self.put(tuple(key) if isinstance(key, list) else key, value)
+
+        return True
@@ -0,0 +1,83 @@
+import threading
+from typing import Any, Callable, Hashable, List, Tuple
+
+# The models loaded by this process, by key
+_models = {}
+
+# One lock per key, so loading one model doesn't block getting the others
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def get_model(key: Hashable, load: Callable[[], Any]) -> Any:
+    """
+    Get the model registered under the given key, loading it on first use.
+
+    The models are shared by the whole process, so every object that needs the same model gets the same instance,
+    and a model is never loaded twice, even if several threads ask for it at once.
+
+    @param key The key of the model, e.g. ('dicta', model_id).
+    @param load A function that loads the model.
+    @return The loaded model.
+    """
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _locks_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        if key not in _models:
+            _models[key] = load()
+        return _models[key]
+
+
+def loaded_models() -> List[Hashable]:
+    return list(_models.keys())
+
+
+def clear():
+    """
+    Drop all the loaded models, e.g. to free their memory.
+    """
+    with _locks_lock:
+        _models.clear()
+        _locks.clear()
+
+
+def _load_dicta_model(model_id: str) -> Tuple[Any, Any]:
+    from transformers import AutoTokenizer, AutoModel
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModel.from_pretrained(model_id, trust_remote_code=True)
+    model.eval()
+    return tokenizer, model
+
+
+def get_dicta_model(model_id: str) -> Tuple[Any, Any]:
+    """
+    Get the tokenizer and the model (in evaluation mode) of one of Dicta's models, e.g. dicta-il/dictabert-seg.
+    """
+    return get_model(('dicta', model_id), lambda: _load_dicta_model(model_id))
+
+
+def _load_phunspell(language: str):
+    from phunspell import Phunspell
+    return Phunspell(language)
+
+
+def get_phunspell(language: str):
+    """
+    Get the Phunspell spell checker of the given language, e.g. he_IL.
+    """
+    return get_model(('phunspell', language), lambda: _load_phunspell(language))
+
+
+def get_whisper_model(model_id: str, cpu_threads: int = 0, num_workers: int = 1):
+    """
+    Get a faster_whisper model with the given settings.
+    """
+    def load():
+        import faster_whisper
+        return faster_whisper.WhisperModel(model_id, cpu_threads=cpu_threads, num_workers=num_workers)
+
+    return get_model(('whisper', model_id, cpu_threads, num_workers), load)
@@ -0,0 +1,230 @@
+import io
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+import soundfile as sf
+from modules.clip_store import ClipStore, load_clip, to_transcription_audio
+from modules.instrumentation import INSTRUMENTATION
+from modules.noise_bank import NoiseBank
+
+# The augmentation of a clip: (background_file, start_point_sec, snr_db, output_path), where output_path is None
+# if the mixed clip was not saved
+Augmentation = Tuple[str, float, float, Optional[str]]
+
+# The result of augmenting a clip: (audio_path, augmentation, mixed audio, error message), where exactly one of the
+# augmentation and the error message is set. The mixed audio (16kHz float32) is set only if it was asked for.
+AugmentationResult = Tuple[str, Optional[Augmentation], Optional[np.ndarray], Optional[str]]
+
+# The noise bank and the clip store of the current worker process, created once by the pool initializer
+_worker_noise_bank = None
+_worker_clip_store = None
+
+
+def calculate_rms(signal):
+    """Calculate Root Mean Square (RMS) of signal"""
+    return np.sqrt(np.mean(signal ** 2))
+
+
+def add_noise_at_snr(speech, noise, target_snr_db, rms_noise=None):
+    """
+    Add noise to speech signal at specified SNR
+
+    SNR (dB) = 20 * log10(RMS_signal / RMS_noise)
+
+    The RMS of the noise is calculated if it is not given.
+
+    Returns: mixed signal
+    """
+    # Calculate RMS of speech and noise
+    rms_speech = calculate_rms(speech)
+    if rms_noise is None:
+        rms_noise = calculate_rms(noise)
+
+    # Calculate required noise scaling factor
+    # SNR_db = 20 * log10(rms_speech / rms_noise_scaled)
+    # 10^(SNR_db/20) = rms_speech / rms_noise_scaled
+    # rms_noise_scaled = rms_speech / 10^(SNR_db/20)
+    # scaling_factor = rms_noise_scaled / rms_noise
+
+    target_rms_noise = rms_speech / (10 ** (target_snr_db / 20))
+    scaling_factor = target_rms_noise / rms_noise if rms_noise > 0 else 0
+
+    # Scale and add noise
+    scaled_noise = noise * scaling_factor
+    mixed = speech + scaled_noise
+
+    return mixed
+
+
+def clip_random(seed: int, audio_path: str) -> random.Random:
+    """
+    Get the random generator of a clip. It depends only on the seed and the clip's filename, so the noise of every
+    clip is the same no matter which worker augments it, or in which order.
+    """
+    return random.Random(f"{seed}:{os.path.basename(audio_path)}")
+
+
+@INSTRUMENTATION.timed('augmentation.mix_with_noise')
+def mix_with_noise(speech: np.ndarray, noise_bank: NoiseBank, rng: random.Random,
+                   snr_min: float, snr_max: float) -> Tuple[np.ndarray, str, float, float]:
+    """
+    Mix speech with a random segment of a random noise file of the noise bank, at a random SNR in range.
+
+    Returns: (mixed, background_file, start_point_sec, snr_db)
+    """
+    # Select random noise file
+    noise_file = rng.choice(noise_bank.names)
+    noise_sr = noise_bank.sample_rate(noise_file)
+
+    # Select random starting point in noise
+    speech_samples = len(speech)
+    max_start_sample = noise_bank.length(noise_file) - speech_samples
+    start_sample = rng.randint(0, max_start_sample)
+    start_point_sec = start_sample / noise_sr
+
+    # Extract noise segment of exact same length as speech (a view of the noise bank), and get its RMS in O(1)
+    noise_segment = noise_bank.segment(noise_file, start_sample, speech_samples)
+    rms_noise = noise_bank.segment_rms(noise_file, start_sample, speech_samples)
+
+    # Random SNR in range
+    snr_db = rng.uniform(snr_min, snr_max)
+
+    # Add noise at target SNR
+    mixed = add_noise_at_snr(speech, noise_segment.astype(np.float64), snr_db, rms_noise=rms_noise)
+
+    return mixed, noise_file, start_point_sec, snr_db
+
+
+def as_saved_wav(mixed: np.ndarray, sr: int) -> np.ndarray:
+    """
+    Get the 16kHz float32 samples a mixed clip has once saved as a WAV file (PCM_16, as saved by augment_clip) and
+    read back: clipped to [-1, 1] and quantized to 16 bits. The clip is written and read in memory with soundfile, so
+    the streamed clips are transcribed exactly like the saved ones (and share their cached transcriptions).
+    """
+    buffer = io.BytesIO()
+    sf.write(buffer, mixed, sr, format='WAV', subtype='PCM_16')
+    buffer.seek(0)
+    audio, sr = sf.read(buffer, dtype='float32')
+    return to_transcription_audio(audio, sr)
+
+
+@INSTRUMENTATION.timed('augmentation.augment_clip')
+def augment_clip(audio_path: str, noise_bank: NoiseBank, output_dir: Optional[str], rng: random.Random,
+                 snr_min: float, snr_max: float, clip_store: ClipStore = None) -> Tuple[Augmentation, np.ndarray, int]:
+    """
+    Process a single audio file: add background noise, and save the mixed audio to the output directory (if any)
+
+    The speech is read from the clip store if one is given.
+
+    Returns: ((background_file, start_point_sec, snr_db, output_path), mixed, sampling_rate)
+    """
+    with INSTRUMENTATION.stage('augmentation.load_clip'):
+        speech, sr = load_clip(audio_path, clip_store)
+    mixed, noise_file, start_point_sec, snr_db = mix_with_noise(speech, noise_bank, rng, snr_min, snr_max)
+
+    output_path = None
+    if output_dir is not None:
+        # Create output filename
+        basename = os.path.basename(audio_path)
+        filename_without_ext = os.path.splitext(basename)[0]
+        output_path = os.path.join(output_dir, filename_without_ext + ".wav")
+
+        # Save mixed audio
+        sf.write(output_path, mixed, sr, subtype='PCM_16')
+
+    return (noise_file, start_point_sec, snr_db, output_path), mixed, sr
+
+
+def _augment_shard(noise_bank: NoiseBank, clip_store: Optional[ClipStore], audio_paths: List[str],
+                   output_dir: Optional[str], seed: int, snr_min: float, snr_max: float,
+                   keep_audio: bool) -> List[AugmentationResult]:
+    results = []
+    for audio_path in audio_paths:
+        try:
+            augmentation, mixed, sr = augment_clip(audio_path, noise_bank, output_dir,
+                                                   clip_random(seed, audio_path), snr_min, snr_max, clip_store)
+            audio = as_saved_wav(mixed, sr) if keep_audio else None
+            results.append((audio_path, augmentation, audio, None))
+        except Exception as e:
+            results.append((audio_path, None, None, str(e)))
+    return results
+
+
+def _init_worker(bank_dir: str, store_dir: Optional[str]):
+    # Each worker process maps the noise bank and the clip store once (their pages are shared by all the workers)
+    global _worker_noise_bank, _worker_clip_store
+    _worker_noise_bank = NoiseBank(bank_dir)
+    _worker_clip_store = ClipStore(store_dir, read_only=True) if store_dir is not None else None
+
+
+def _augment_worker_shard(audio_paths: List[str], output_dir: Optional[str], seed: int,
+                          snr_min: float, snr_max: float, keep_audio: bool) -> List[AugmentationResult]:
+    return _augment_shard(_worker_noise_bank, _worker_clip_store, audio_paths, output_dir, seed, snr_min, snr_max,
+                          keep_audio)
+
+
+class AugmentationEngine:
+    """
+    Mixes speech clips with random background noise at random SNRs, in this process or across a pool of
+    num_workers processes.
+
+    The random choices of every clip (noise file, start point and SNR) are seeded by the seed and the clip's
+    filename, so the augmented clips are reproducible and don't depend on the number of workers.
+
+    The mixed clips are saved as WAV files to the output directory, unless it is None. Either way, they can be
+    streamed in memory to the transcription engine. If a clip store is given, the speech clips are read from it
+    instead of being decoded.
+    """
+
+    def __init__(self, noise_bank: NoiseBank, output_dir: Optional[str], snr_min: float, snr_max: float, seed: int = 0,
+                 num_workers: int = 1, chunk_size: int = 16, clip_store: ClipStore = None):
+        self.noise_bank = noise_bank
+        self.clip_store = clip_store
+        self.output_dir = output_dir
+        self.snr_min = snr_min
+        self.snr_max = snr_max
+        self.seed = seed
+        self.num_workers = num_workers
+        self.chunk_size = chunk_size
+
+    def _shards(self, audio_paths: Iterable[str]) -> Iterator[List[str]]:
+        audio_paths = iter(audio_paths)
+        while True:
+            shard = list(islice(audio_paths, self.chunk_size))
+            if not shard:
+                return
+            yield shard
+
+    def augment(self, audio_paths: Iterable[str], keep_audio: bool = False) -> Iterator[AugmentationResult]:
+        """
+        Augment the given clips, writing each mixed clip as a WAV file to the output directory (if any).
+
+        @param audio_paths The paths of the speech clips.
+        @param keep_audio Whether to return the mixed audio of the clips (as 16kHz float32 samples).
+        @return The (audio_path, augmentation, mixed audio, error message) of every clip, in the order of the clips.
+        """
+        if self.output_dir is not None:
+            os.makedirs(self.output_dir, exist_ok=True)
+        args = (self.output_dir, self.seed, self.snr_min, self.snr_max, keep_audio)
+
+        if self.num_workers <= 1:
+            for shard in self._shards(audio_paths):
+                yield from _augment_shard(self.noise_bank, self.clip_store, shard, *args)
+            return
+
+        store_dir = self.clip_store.store_dir if self.clip_store is not None else None
+        with ProcessPoolExecutor(max_workers=self.num_workers, initializer=_init_worker,
+                                 initargs=(self.noise_bank.bank_dir, store_dir)) as executor:
+            # Keep a bounded number of shards in flight, and collect them in the order they were submitted
+            pending = deque()
+            for shard in self._shards(audio_paths):
+                pending.append(executor.submit(_augment_worker_shard, shard, *args))
+                if len(pending) >= 2 * self.num_workers:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import os
+from typing import List, Tuple
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+# The version of the noise bank files. Banks built with another version are rebuilt.
+NOISE_BANK_VERSION = 1
+
+MANIFEST_FILE = 'manifest.json'
+SAMPLES_FILE = 'samples.f32'
+SQUARES_FILE = 'squares.f64'
+
+
+def find_long_noise_files(noise_dir: str, min_duration: float = 30) -> List[str]:
+    """Find noise files longer than min_duration seconds"""
+    noise_files = [f for f in os.listdir(noise_dir) if f.endswith('.wav')]
+    long_files = []
+
+    for noise_file in noise_files:
+        filepath = os.path.join(noise_dir, noise_file)
+        try:
+            info = sf.info(filepath)
+            duration = info.duration
+            if duration > min_duration:
+                long_files.append(noise_file)
+        except Exception as e:
+            logger.warning("Warning: Could not read %s: %s", noise_file, e)
+
+    return long_files
+
+
+def source_signature(noise_dir: str, min_duration: float) -> str:
+    """
+    Get a signature of the noise files of a directory (their names, sizes and modification times), which changes
+    whenever a file is added, removed or modified, without reading any of the files.
+    """
+    files = []
+    for name in sorted(os.listdir(noise_dir)):
+        if name.endswith('.wav'):
+            stat = os.stat(os.path.join(noise_dir, name))
+            files.append([name, stat.st_size, stat.st_mtime_ns])
+
+    content = json.dumps({'version': NOISE_BANK_VERSION, 'min_duration': min_duration, 'files': files})
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class NoiseBank:
+    """
+    The eligible noise files of a directory (Musan: 16kHz mono WAV), concatenated into a single float32 array that
+    is memory-mapped from disk, so it is shared by all the processes that use it.
+
+    A manifest gives the offset, length and sampling rate of every file, and a prefix sum of the squared samples
+    gives the RMS of any noise segment in O(1). The bank is built once by load_or_build, and rebuilt only when the
+    files of the source directory change.
+    """
+
+    def __init__(self, bank_dir: str):
+        self.bank_dir = bank_dir
+
+        with open(os.path.join(bank_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+        self.noise_dir = self.manifest['noise_dir']
+
+        # Sorted, so the random choices of the files don't depend on the order of the directory listing
+        self.names = sorted(self.manifest['files'])
+
+        total_samples = self.manifest['total_samples']
+        if total_samples > 0:
+            self.samples = np.memmap(os.path.join(bank_dir, SAMPLES_FILE), dtype=np.float32, mode='r',
+                                     shape=(total_samples,))
+            self.squares = np.memmap(os.path.join(bank_dir, SQUARES_FILE), dtype=np.float64, mode='r',
+                                     shape=(total_samples + 1,))
+        else:
+            self.samples = np.zeros(0, dtype=np.float32)
+            self.squares = np.zeros(1, dtype=np.float64)
+
+    @classmethod
+    def build(cls, noise_dir: str, bank_dir: str, min_duration: float = 30) -> 'NoiseBank':
+        """
+        Build a noise bank from the noise files longer than min_duration seconds in the given directory.
+        """
+        os.makedirs(bank_dir, exist_ok=True)
+        noise_files = sorted(find_long_noise_files(noise_dir, min_duration))
+
+        # Find the position of every file in the bank
+        files = {}
+        total_samples = 0
+        for noise_file in noise_files:
+            info = sf.info(os.path.join(noise_dir, noise_file))
+            if info.channels != 1:
+                logger.warning("Warning: Skipping %s: %d channels", noise_file, info.channels)
+                continue
+            files[noise_file] = {'offset': total_samples, 'length': info.frames, 'sample_rate': info.samplerate}
+            total_samples += info.frames
+
+        # Write the samples and the prefix sum of their squares to temporary files, and then replace the bank
+        samples_path = os.path.join(bank_dir, SAMPLES_FILE)
+        squares_path = os.path.join(bank_dir, SQUARES_FILE)
+        if total_samples > 0:
+            samples = np.memmap(samples_path + '.tmp', dtype=np.float32, mode='w+', shape=(total_samples,))
+            squares = np.memmap(squares_path + '.tmp', dtype=np.float64, mode='w+', shape=(total_samples + 1,))
+            squares[0] = 0
+            for noise_file, entry in files.items():
+                start, end = entry['offset'], entry['offset'] + entry['length']
+                noise, _ = sf.read(os.path.join(noise_dir, noise_file), dtype='float32')
+                samples[start:end] = noise
+                squares[start + 1:end + 1] = squares[start] + np.cumsum(np.square(noise, dtype=np.float64))
+            samples.flush()
+            squares.flush()
+            del samples, squares
+            os.replace(samples_path + '.tmp', samples_path)
+            os.replace(squares_path + '.tmp', squares_path)
+
+        # The manifest is written last, so a bank whose build was interrupted is rebuilt
+        manifest = {
+            'version': NOISE_BANK_VERSION,
+            'noise_dir': noise_dir,
+            'min_duration': min_duration,
+            'source_signature': source_signature(noise_dir, min_duration),
+            'total_samples': total_samples,
+            'files': files
+        }
+        manifest_path = os.path.join(bank_dir, MANIFEST_FILE)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+        return cls(bank_dir)
+
+    @classmethod
+    def load_or_build(cls, noise_dir: str, bank_dir: str, min_duration: float = 30) -> 'NoiseBank':
+        """
+        Open the noise bank in bank_dir if it was built from the current files of noise_dir, or else (re)build it.
+        """
+        manifest_path = os.path.join(bank_dir, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('source_signature') == source_signature(noise_dir, min_duration):
+                return cls(bank_dir)
+
+        logger.info("Building the noise bank of %s in %s", noise_dir, bank_dir)
+        return cls.build(noise_dir, bank_dir, min_duration)
+
+    def sample_rate(self, name: str) -> int:
+        return self.manifest['files'][name]['sample_rate']
+
+    def length(self, name: str) -> int:
+        return self.manifest['files'][name]['length']
+
+    def noise(self, name: str) -> Tuple[np.ndarray, int]:
+        """
+        Get the samples (a read-only view of the bank) and the sampling rate of the given noise file.
+        """
+        entry = self.manifest['files'][name]
+        return self.samples[entry['offset']:entry['offset'] + entry['length']], entry['sample_rate']
+
+    def _bounds(self, name: str, start: int, length: int) -> Tuple[int, int]:
+        # The bounds of a segment in the bank, cut at the end of its file
+        entry = self.manifest['files'][name]
+        start = entry['offset'] + start
+        end = min(start + length, entry['offset'] + entry['length'])
+        return start, end
+
+    def segment(self, name: str, start: int, length: int) -> np.ndarray:
+        """
+        Get a segment of the given noise file, as a read-only view of the bank (it is shorter than length samples if
+        it reaches the end of the file).
+        """
+        start, end = self._bounds(name, start, length)
+        return self.samples[start:end]
+
+    def segment_rms(self, name: str, start: int, length: int) -> float:
+        """
+        Get the RMS of a segment of the given noise file in O(1), from the prefix sum of the squared samples.
+        """
+        start, end = self._bounds(name, start, length)
+        if end <= start:
+            return float('nan')
+        return float(np.sqrt(max(self.squares[end] - self.squares[start], 0.0) / (end - start)))
+
+    def __len__(self) -> int:
+        return len(self.names)
@@ -0,0 +1,53 @@
+import hashlib
+from typing import List, Optional, Tuple
+from modules.lru_cache import LRUCache
+from modules.sqlite_cache import SQLiteCache
+
+
+class NormalizationCache:
+    """
+    A two-level cache of normalized texts: an in-memory LRU cache, backed by an optional persistent SQLite cache.
+    Every text is cached with the corrections made to it, as (step, old word, new word) triples.
+
+    The keys are hashes of the input text together with a fingerprint of the normalizer (its version, models and
+    correction dictionaries), so changing the normalizer invalidates all the entries it cached before.
+    """
+
+    def __init__(self, fingerprint: str, filename: str = None, max_memory_entries: int = 100000,
+                 max_disk_entries: int = 10000000):
+        self.fingerprint = fingerprint.encode('utf-8')
+        self.memory = LRUCache(max_size=max_memory_entries)
+        self.disk = SQLiteCache(filename, max_entries=max_disk_entries) if filename is not None else None
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(self.fingerprint + b'\0' + text.encode('utf-8')).hexdigest()
+
+    def get(self, text: str) -> Optional[Tuple[str, List[Tuple[str, str, str]]]]:
+        """
+        Get the cached normalized form of the given text and its corrections, from memory or else from disk.
+
+        @param text The text before normalization.
+        @return The normalized text and its corrections, or None if it is not cached.
+        """
+        key = self._key(text)
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                normalized_text, corrections = entry
+                entry = (normalized_text, [tuple(correction) for correction in corrections])
+                self.memory.put(key, entry)
+        return entry
+
+    def put(self, text: str, normalized_text: str, corrections: List[Tuple[str, str, str]] = ()):
+        key = self._key(text)
+        entry = (normalized_text, list(corrections))
+        self.memory.put(key, entry)
+        if self.disk is not None:
+            self.disk.put(key, entry)
+
+    def stats(self) -> dict:
+        return {
+            'memory': self.memory.stats(),
+            'disk': self.disk.stats() if self.disk is not None else None
+        }
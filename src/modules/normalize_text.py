@@ -1,125 +1,119 @@
+import hashlib
+import json
+import logging
 import re
+from typing import Iterable, List, Tuple
 
 from num2words import num2words
-from transformers import AutoTokenizer, AutoModel
 from consts.correction_dict import CorrectionDict
-from phunspell import Phunspell
+from modules.model_registry import get_dicta_model, get_phunspell
+from modules.normalization_cache import NormalizationCache
+from modules.correction_rules import CompiledCorrections
+from modules.spell_checker import SpellChecker
+from modules.instrumentation import INSTRUMENTATION
+from modules.correction_audit import Correction, CorrectionAudit
+
+logger = logging.getLogger(__name__)
+
+# The version of the normalization steps. It is part of the normalization cache keys,
+# so it must be increased whenever a change to the steps changes their results (or the cached entries).
+NORMALIZER_VERSION = 2
+
+# The models and dictionary used by the normalization steps
+MENAKED_MODEL_ID = 'dicta-il/dictabert-large-char-menaked'
+SEG_MODEL_ID = 'dicta-il/dictabert-seg'
+PHUNSPELL_LANGUAGE = 'he_IL'
 
 # This class is used to normalize the text of the transcriptions or original text among various normalization steps.
+# The normalized texts are cached (in memory, and in the given cache file if any), so each text is normalized once.
+# The spelling corrections of words are cached the same way (in the given spelling cache file if any).
+# The corrections made to every text are cached with its normalized text, and recorded in an audit (written to the
+# given audit file if any) every time the text is normalized, whether it was cached or not.
+# The models are loaded on first use, and shared by all the NormalizeText objects of the process (see modules.model_registry).
 class NormalizeText:
-    def __init__(self):
+    def __init__(self, cache_file: str = None, spelling_cache_file: str = None, audit_file: str = None):
 
-        # Load Dicta's morphological model for normalizing spelling (Ktiv Male to Ktiv Haser form)
-        self.tokenizer_large_char_menaked = AutoTokenizer.from_pretrained('dicta-il/dictabert-large-char-menaked')
-        self.model_large_char_menaked = AutoModel.from_pretrained('dicta-il/dictabert-large-char-menaked', trust_remote_code=True)
-        self.model_large_char_menaked.eval()
-       
-        # Load Dicta's morphological model for normalizing spelling segmentation (Seperate word prefixes from the rest of the word)
-        self.tokenizer_seg = AutoTokenizer.from_pretrained('dicta-il/dictabert-seg')
-        self.model_seg = AutoModel.from_pretrained('dicta-il/dictabert-seg', trust_remote_code=True)
-        self.model_seg.eval()
+        # Audit of the corrections made to the texts
+        self.audit = CorrectionAudit(audit_file)
 
-        # Load Phunspell for correcting spelling (OOV words)
-        self.phunspell = Phunspell('he_IL')
+        # Correction dictionary for common errors, and its compiled dictionaries
+        self.correction_dict = CorrectionDict()
+        self.compiled_corrections = {}
 
-        # List to store the corrections made to the text
-        self.corrections = []
+        # Spelling corrections of OOV words, memoized per word
+        self.spell_checker = SpellChecker(
+            PHUNSPELL_LANGUAGE,
+            self.correction_dict.hebrew_correct_oov_words,
+            cache_file=spelling_cache_file
+        )
 
-        # Correction dictionary for common errors
-        self.correction_dict = CorrectionDict()
+        # Cache of the normalized texts
+        self.cache = NormalizationCache(self.fingerprint(), cache_file)
+
+    # Dicta's morphological model for normalizing spelling (Ktiv Male to Ktiv Haser form)
+    @property
+    def tokenizer_large_char_menaked(self):
+        return get_dicta_model(MENAKED_MODEL_ID)[0]
+
+    @property
+    def model_large_char_menaked(self):
+        return get_dicta_model(MENAKED_MODEL_ID)[1]
+
+    # Dicta's morphological model for normalizing spelling segmentation (Seperate word prefixes from the rest of the word)
+    @property
+    def tokenizer_seg(self):
+        return get_dicta_model(SEG_MODEL_ID)[0]
+
+    @property
+    def model_seg(self):
+        return get_dicta_model(SEG_MODEL_ID)[1]
+
+    # Phunspell for correcting spelling (OOV words)
+    @property
+    def phunspell(self):
+        return get_phunspell(PHUNSPELL_LANGUAGE)
+
+    # This function is used to identify the normalizer: its version, models and correction dictionaries.
+    # The correction dictionaries are hashed as ordered lists of (error, correction) pairs, as the first matching
+    # error wins, so reordering a dictionary changes the fingerprint (only the dictionary names are sorted).
+    def fingerprint(self) -> str:
+        corrections = {name: list(value.items()) if isinstance(value, dict) else value
+                       for name, value in vars(self.correction_dict).items()}
+        content = json.dumps({
+            'version': NORMALIZER_VERSION,
+            'models': [MENAKED_MODEL_ID, SEG_MODEL_ID, PHUNSPELL_LANGUAGE],
+            'corrections': corrections
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
     
     # This function is used to handle common errors in the text by replacing the errors with the corrections.
     # It can also check for absolute equality between the error and the correction.
-    def _handle_common_errors(self, text: str, error_dict: dict, check_absolute_equality: bool = False) -> str:
-        
-        # Separate single-word and multi-word errors into two dictionaries
-        errors_one_word = {error: correction for error, correction in error_dict.items() if ' ' not in error}
-        errors_two_words = {error: correction for error, correction in error_dict.items() if ' ' in error}
-
-        new_text = []
-
-        # Flag to skip the current word if it is an error and the correction is a multi-word error
-        skip = False
-
-        # Iterate over the words in the text
-        for current_word, next_word in zip(text.split(), text.split()[1:]):
-            
-            # Save the original word for printing the replacement
-            old_word = current_word
-
-            # If the skip flag is True, skip the current word and print the replacement
-            if skip:
-                skip = False
-                print(f"Replacing: {old_word} -> ''")
-                continue
-            
-            # Iterate over the multi-word errors
-            for error, correction in errors_two_words.items():
-
-                # Check if the current word and the next word matches the correction
-                if (f"{current_word} {next_word}".endswith(correction) and not check_absolute_equality) \
-                or (f"{current_word} {next_word}" == correction and check_absolute_equality):
-
-                    # Set the skip flag to True and replace the current word and the next word with the correction
-                    skip = True
-                    current_word = current_word + ' ' + next_word
-                    break
-
-                # Check if the current word and the next word matches the error
-                elif (f"{current_word} {next_word}".endswith(error) and not check_absolute_equality) \
-                or (f"{current_word} {next_word}" == error and check_absolute_equality):
-                    
-                    # Set the skip flag to True and replace the current word and the next word with the correction
-                    skip = True
-                    if len(correction.split()) == 1:
-                        current_word = current_word.replace(error.split()[0], correction)
-                    else:
-                        current_word = current_word.replace(error.split()[0], correction.split()[0])
-                        next_word = next_word.replace(error.split()[1], correction.split()[1])
-                        current_word = current_word + ' ' + next_word
-                    break
-                    
-            # Iterate over the single-word errors in case no multi-word error was found
-            if not skip:
-                for error, correction in errors_one_word.items():
-
-                    # Check if the current word matches the error
-                    if (current_word.endswith(error) and not check_absolute_equality) \
-                    or (current_word == error and check_absolute_equality):
-                        current_word = current_word.replace(error, correction)
-                        break
-
-            # If the original word is not the same as the current word, print the replacement
-            if old_word != current_word:
-                print(f"Replacing: {old_word} -> {current_word}")
-
-            # Add the current word to the new text
-            new_text.append(current_word)
-        
-        # Save the last word for printing the replacement
-        old_word = text.split()[-1]
-
-        # If the skip flag is False, handle the last word
-        if not skip:
-            current_word = text.split()[-1]
-            for error, correction in errors_one_word.items():
-
-                # Check if the current word matches the error
-                if (current_word.endswith(error) and not check_absolute_equality) \
-                or (current_word == error and check_absolute_equality):
-                    current_word = current_word.replace(error, correction)
-                    break
-
-            # If the original word is not the same as the current word, print the replacement
-            if old_word != current_word:
-                print(f"Replacing: {old_word} -> {current_word}")
-            new_text.append(current_word)
-        else:
-            # If the skip flag is True, print the replacement
-            print(f"Replacing: {old_word} -> ''")
-
-        # Return the new text as a single string
-        return ' '.join(new_text)
+    # Each correction dictionary is compiled into lookup tables on first use (see modules.correction_rules).
+    # The replacements are added to the given corrections (if any) as corrections of the step named after the
+    # correction dictionary.
+    @INSTRUMENTATION.timed('normalize.common_errors')
+    def _handle_common_errors(self, text: str, error_dict: dict, check_absolute_equality: bool = False,
+                              corrections: List[Correction] = None) -> str:
+        key = (id(error_dict), check_absolute_equality)
+        compiled = self.compiled_corrections.get(key)
+
+        # Compile the dictionary if it was not compiled yet (keeping a reference to it, so its id stays unique)
+        if compiled is None or compiled[0] is not error_dict:
+            step = next((name for name, value in vars(self.correction_dict).items() if value is error_dict),
+                        'common_errors')
+            compiled = (error_dict, CompiledCorrections(error_dict, check_absolute_equality), step)
+            self.compiled_corrections[key] = compiled
+
+        _, compiled_corrections, step = compiled
+        if corrections is None:
+            return compiled_corrections.apply(text)
+        return compiled_corrections.apply(text, lambda old, new: corrections.append((step, old, new)))
+
+    # This function is used to record the corrections made to a text in the audit.
+    def _audit_corrections(self, cnt: int, type_of_text: str, corrections: List[Correction]):
+        for step, old, new in corrections:
+            logger.debug("%s) %s %s: '%s' corrected to '%s'", cnt, type_of_text, step, old, new)
+            self.audit.record(cnt, type_of_text, step, old, new)
    
     # This function is used to normalize the hours in the text by converting them to the 12-hour format.
     def _normalize_hours(self, text: str) -> str:
@@ -138,7 +132,8 @@ class NormalizeText:
         return text
     
     # This function is used to convert numbers to words and handle common errors in the text.
-    def _number_to_words(self, text: str) -> str:
+    @INSTRUMENTATION.timed('normalize.number_to_words')
+    def _number_to_words(self, text: str, corrections: List[Correction] = None) -> str:
 
         # Normalize the hours in the text
         text = self._normalize_hours(text)
@@ -151,13 +146,14 @@ class NormalizeText:
             text = text.replace(number, num2words(number, lang='he'))
 
         # Convert all masculine Hebrew numbers to feminine numbers
-        text = self._handle_common_errors(text, self.correction_dict.numbers_m_to_f)
+        text = self._handle_common_errors(text, self.correction_dict.numbers_m_to_f, corrections=corrections)
         return text
 
     # The predict method returns the text with Niqqud, 
     # but it ALSO standardizes the spelling to a consistent Male/Hasar form.
     # By default, it removes extra Matres Lectionis.
     # This function is used to normalize the spelling of the text by converting it to the Male/Hasar form.
+    @INSTRUMENTATION.timed('normalize.spelling_model')
     def _normalize_spelling(self, text: str) -> str:
         result = self.model_large_char_menaked.predict([text], self.tokenizer_large_char_menaked)
         
@@ -169,18 +165,16 @@ class NormalizeText:
     
     # This function is used to correct the spelling of the text by using Phunspell.
     # For OOV words that are not legal Hebrew words, it will use the Phunspell suggestions.
-    def _correct_text(self, text: str, cnt: int) -> str:
+    @INSTRUMENTATION.timed('normalize.correct_oov_words')
+    def _correct_text(self, text: str, corrections: List[Correction] = None) -> str:
         list_correct = []
         for word in text.split():
-            # Check if word ends with any word in the correction dictionary of OOV words (Exceptions for words that are not legal Hebrew words)
-            ends_with_oov = any(word.endswith(oov_word) for oov_word in self.correction_dict.hebrew_correct_oov_words)
-
             # If the word is not in the Phunspell dictionary and is not an exception for words that are not legal Hebrew words
-            # use the Phunspell suggestions to correct the word
-            if not self.phunspell.lookup(word) and not ends_with_oov:
-                corrected_word = next(self.phunspell.suggest(word), word)
-                print(f"{str(cnt)}) -> '%s' corrected to '%s'" % (word, corrected_word))
-                self.corrections.append((cnt, word, corrected_word))
+            # (words ending with a word in the correction dictionary of OOV words), use the Phunspell suggestions to correct the word
+            corrected_word = self.spell_checker.correct(word)
+            if corrected_word is not None:
+                if corrections is not None:
+                    corrections.append(('spelling', word, corrected_word))
                 list_correct.append(corrected_word)
             else:
                 list_correct.append(word)
@@ -189,11 +183,17 @@ class NormalizeText:
 
     # This function is used to normalize the spelling segmentation of the text
     # by separating word prefixes from the rest of the word.
+    @INSTRUMENTATION.timed('normalize.segmentation_model')
     def _normalize_spelling_seg(self, text: str) -> str:
         result = self.model_seg.predict([text], self.tokenizer_seg)
-        return ' '.join([' '.join(tokens) for tokens in result[0]][1:-1])
+        return self._join_segments(result[0])
+
+    # This function is used to join the segmented words predicted for a text, without the [CLS] and [SEP] tokens.
+    def _join_segments(self, segmented_words: list) -> str:
+        return ' '.join([' '.join(tokens) for tokens in segmented_words][1:-1])
 
     # This function is used to handle connected words in the text by connect prefix words with the next word.
+    @INSTRUMENTATION.timed('normalize.connected_words')
     def _handle_connected_words(self, text: str) -> str:
         list_connected_words = []
         prefix = False
@@ -225,14 +225,13 @@ class NormalizeText:
         return text
   
     # This function is used to remove Hebrew Nikkud from the text.
+    @INSTRUMENTATION.timed('normalize.remove_nikkud')
     def _remove_nikkud(self, text: str) -> str:
        return re.sub('[\u0591-\u05C7]+', '', text)
 
-    # This function is used to normalize the text by applying all the normalization steps.
-    def normalize_text(self, text: str, cnt: int, type_of_text: str) -> str:
-
-        # Print the original text
-        print(f"{str(cnt)}) {type_of_text} Before: {text}")
+    # This function is used to apply the normalization steps that come before normalizing the spelling.
+    @INSTRUMENTATION.timed('normalize.before_spelling')
+    def _normalize_before_spelling(self, text: str, corrections: List[Correction] = None) -> str:
 
         # Remove punctuation and special characters and replace percentage with "אחוזים"
         text = re.sub('[!?.,:;()"”“״]', '', text)
@@ -243,7 +242,7 @@ class NormalizeText:
         text = self._remove_nikkud(text)
 
         # Convert numbers to words
-        text = self._number_to_words(text)
+        text = self._number_to_words(text, corrections)
 
         # Replace dashes with spaces
         text = re.sub('[-–־—]', ' ', text)
@@ -255,15 +254,21 @@ class NormalizeText:
         text = self._handle_common_errors(
             text, 
             self.correction_dict.pre_normalization_corrections_force_equality, 
-            check_absolute_equality=True
+            check_absolute_equality=True,
+            corrections=corrections
         )
         text = self._handle_common_errors(
             text,
-            self.correction_dict.pre_normalization_corrections
+            self.correction_dict.pre_normalization_corrections,
+            corrections=corrections
         )
-        
-        # Normalize the spelling of the text by converting it from Ktiv Male to Ktiv Hasar form.
-        text = self._normalize_spelling(text)
+
+        return text
+
+    # This function is used to apply the rule steps between normalizing the spelling
+    # and normalizing the spelling segmentation, before correcting the OOV words.
+    @INSTRUMENTATION.timed('normalize.after_spelling')
+    def _normalize_after_spelling(self, text: str, corrections: List[Correction] = None) -> str:
 
         # Remove punctuation and special characters and replace dashes with spaces
         text = re.sub('[!?.,:;()"”“״’‘\']', '', text)
@@ -273,28 +278,188 @@ class NormalizeText:
         text = self._handle_common_errors(
             text,
             self.correction_dict.post_normalization_corrections_force_equality,
-            check_absolute_equality=True
+            check_absolute_equality=True,
+            corrections=corrections
         )
 
         # Add leading and trailing spaces to replace also words that are at the beginning or end of the text
         text = self._handle_common_errors(
             text,
-            self.correction_dict.post_normalization_corrections
+            self.correction_dict.post_normalization_corrections,
+            corrections=corrections
         )
-        
+
+        return text
+
+    # This function is used to apply the normalization steps that come after normalizing the spelling segmentation.
+    @INSTRUMENTATION.timed('normalize.after_segmentation')
+    def _normalize_after_segmentation(self, text: str, corrections: List[Correction] = None) -> str:
+
+        # Handle common errors in the text by replacing the errors with the corrections after normalizing the spelling segmentation.
+        text = self._handle_common_errors(text, self.correction_dict.post_prefix_seg_corrections, check_absolute_equality=True,
+                                         corrections=corrections)
+
+        # Join the words in the text with spaces
+        text = " ".join(text.split())
+
+        return text
+
+    # This function is used to normalize the text by applying all the normalization steps.
+    @INSTRUMENTATION.timed('normalize.text')
+    def normalize_text(self, text: str, cnt: int, type_of_text: str) -> str:
+
+        # Log the original text
+        logger.debug("%s) %s Before: %s", cnt, type_of_text, text)
+
+        # Take the normalized text and its corrections from the cache, or normalize it and cache them
+        cached = self.cache.get(text)
+        if cached is None:
+            cached = self._normalize_uncached(text)
+            self.cache.put(text, *cached)
+        normalized_text, corrections = cached
+        self._audit_corrections(cnt, type_of_text, corrections)
+
+        # Log the normalized text
+        logger.debug("%s) %s After: %s", cnt, type_of_text, normalized_text)
+
+        return normalized_text
+
+    # This function is used to normalize a text by applying all the normalization steps, without the cache.
+    # Returns the normalized text and the corrections made to it.
+    def _normalize_uncached(self, text: str) -> Tuple[str, List[Correction]]:
+        corrections = []
+
+        # Apply the rule steps before normalizing the spelling
+        text = self._normalize_before_spelling(text, corrections)
+
+        # Normalize the spelling of the text by converting it from Ktiv Male to Ktiv Hasar form.
+        text = self._normalize_spelling(text)
+
+        # Apply the rule steps after normalizing the spelling
+        text = self._normalize_after_spelling(text, corrections)
+
         # Correct OOV words that are not legal Hebrew words by using Phunspell.
-        text = self._correct_text(text, cnt)
+        text = self._correct_text(text, corrections)
 
         # Normalize the spelling segmentation of the text by separating word prefixes from the rest of the word.
         text = self._normalize_spelling_seg(text)
         
-        # Handle common errors in the text by replacing the errors with the corrections after normalizing the spelling segmentation.
-        text = self._handle_common_errors(text, self.correction_dict.post_prefix_seg_corrections, check_absolute_equality=True)
+        # Apply the rule steps after normalizing the spelling segmentation
+        text = self._normalize_after_segmentation(text, corrections)
+
+        return text, corrections
+
+    # This function is used to resolve the spelling corrections of the vocabulary of a whole corpus in one pass,
+    # before its texts are normalized. The rule steps are applied to the texts that are not cached yet, without the
+    # spelling model, so the vocabulary approximates the words reaching the spell checker (the words the model
+    # changes are resolved when the texts are corrected). Returns the number of distinct words resolved.
+    @INSTRUMENTATION.timed('normalize.preresolve_vocabulary')
+    def preresolve_vocabulary(self, texts: Iterable[str]) -> int:
+        vocabulary = set()
+        for text in set(texts):
+            if isinstance(text, str) and self.cache.get(text) is None:
+                text = self._remove_nikkud(self._normalize_before_spelling(text))
+                vocabulary.update(self._normalize_after_spelling(text).split())
+        return self.spell_checker.preresolve(vocabulary)
+
+    # This function is used to run a model's predict method on batches of texts of similar lengths.
+    # Sorting the texts by length keeps the padding in each batch to a minimum. The predictions are returned in the
+    # order of the given texts.
+    def _predict_batches(self, model, tokenizer, texts: List[str], batch_size: int) -> list:
+        import torch
+
+        predictions = [None] * len(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+
+        with torch.inference_mode():
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                for i, prediction in zip(batch, model.predict([texts[i] for i in batch], tokenizer)):
+                    predictions[i] = prediction
+
+        return predictions
+
+    # This function is used to normalize a list of texts by applying all the normalization steps,
+    # giving the same results as normalize_text on each of the texts.
+    # The rule steps are applied to every text, while the two models run on length-bucketed batches of texts.
+    # Only texts that are not cached yet are normalized. The corrections of every text are audited under its own cnt
+    # and type, including the cached and repeated texts.
+    @INSTRUMENTATION.timed('normalize.batch')
+    def normalize_batch(self, texts: List[str], cnts: List[int] = None, types_of_text: List[str] = None,
+                        batch_size: int = 32) -> List[str]:
+        if cnts is None:
+            cnts = list(range(1, len(texts) + 1))
+        if types_of_text is None:
+            types_of_text = ['Text'] * len(texts)
+
+        # Log the original texts
+        log_texts = logger.isEnabledFor(logging.DEBUG)
+        if log_texts:
+            for text, cnt, type_of_text in zip(texts, cnts, types_of_text):
+                logger.debug("%s) %s Before: %s", cnt, type_of_text, text)
+
+        # Take the normalized texts and their corrections from the cache, and find the (distinct) texts that are not
+        # cached
+        cached = [self.cache.get(text) for text in texts]
+        uncached = {}
+        for i, (text, entry) in enumerate(zip(texts, cached)):
+            if entry is None and text not in uncached:
+                uncached[text] = i
+
+        INSTRUMENTATION.count('normalize.texts', len(texts))
+        INSTRUMENTATION.count('normalize.uncached_texts', len(uncached))
+
+        # Normalize the texts that are not cached, and cache them
+        if uncached:
+            uncached_texts = list(uncached.keys())
+            results = dict(zip(uncached_texts, self._normalize_batch_uncached(uncached_texts, batch_size)))
+            for text, (normalized_text, corrections) in results.items():
+                self.cache.put(text, normalized_text, corrections)
+            cached = [results[text] if entry is None else entry for text, entry in zip(texts, cached)]
+
+        # Audit the corrections of every text
+        normalized_texts = []
+        for (normalized_text, corrections), cnt, type_of_text in zip(cached, cnts, types_of_text):
+            normalized_texts.append(normalized_text)
+            if corrections:
+                self._audit_corrections(cnt, type_of_text, corrections)
+
+        # Log the normalized texts
+        if log_texts:
+            for text, cnt, type_of_text in zip(normalized_texts, cnts, types_of_text):
+                logger.debug("%s) %s After: %s", cnt, type_of_text, text)
+
+        return normalized_texts
+
+    # This function is used to normalize a list of texts by applying all the normalization steps, without the cache.
+    # Returns the normalized text and the corrections made to it of every text.
+    def _normalize_batch_uncached(self, texts: List[str], batch_size: int) -> List[Tuple[str, List[Correction]]]:
+        corrections = [[] for _ in texts]
+
+        # Apply the rule steps before normalizing the spelling
+        texts = [self._normalize_before_spelling(text, text_corrections)
+                 for text, text_corrections in zip(texts, corrections)]
+
+        # Normalize the spelling of the texts by converting them from Ktiv Male to Ktiv Hasar form.
+        with INSTRUMENTATION.stage('normalize.spelling_model'):
+            vocalized_texts = self._predict_batches(
+                self.model_large_char_menaked, self.tokenizer_large_char_menaked, texts, batch_size)
+        texts = [self._remove_nikkud(vocalized_text) for vocalized_text in vocalized_texts]
+
+        # Apply the rule steps after normalizing the spelling
+        texts = [self._normalize_after_spelling(text, text_corrections)
+                 for text, text_corrections in zip(texts, corrections)]
 
-        # Join the words in the text with spaces
-        text = " ".join(text.split())
+        # Correct OOV words that are not legal Hebrew words by using Phunspell.
+        texts = [self._correct_text(text, text_corrections) for text, text_corrections in zip(texts, corrections)]
+
+        # Normalize the spelling segmentation of the texts by separating word prefixes from the rest of the words.
+        with INSTRUMENTATION.stage('normalize.segmentation_model'):
+            segmented_texts = self._predict_batches(self.model_seg, self.tokenizer_seg, texts, batch_size)
+        texts = [self._join_segments(segmented_words) for segmented_words in segmented_texts]
 
-        # Print the normalized text
-        print(f"{str(cnt)}) {type_of_text} After: {text}")
+        # Apply the rule steps after normalizing the spelling segmentation
+        texts = [self._normalize_after_segmentation(text, text_corrections)
+                 for text, text_corrections in zip(texts, corrections)]
 
-        return text
\ No newline at end of file
+        return list(zip(texts, corrections))
@@ -0,0 +1,115 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
+from modules.accuracy_statistics import AccuracyStatistics
+from modules.edit_weights import PAIR_WEIGHT_CACHE
+from modules.instrumentation import INSTRUMENTATION
+from modules.normalize_text import NormalizeText
+
+# A row to evaluate: (index, filename, reference_text, transcribed_text)
+EvaluationRow = Tuple[int, str, str, str]
+
+# The result of an evaluated row: (filename, reference_words, transcribed_words, accuracy_statistics)
+EvaluationResult = Tuple[str, List[str], List[str], AccuracyStatistics]
+
+# The normalizer of the current worker process, created once by the pool initializer
+_worker_normalize = None
+
+
+@INSTRUMENTATION.timed('evaluation.evaluate_rows')
+def evaluate_rows(normalize: NormalizeText, rows: List[EvaluationRow], to_normalize: bool) -> List[EvaluationResult]:
+    """
+    Normalize (optionally) and align a chunk of rows of the transcriptions file.
+
+    The reference and transcribed texts of all the rows are normalized together in one batch.
+
+    @param normalize The normalizer to use if to_normalize is set.
+    @param rows The (index, filename, reference_text, transcribed_text) rows.
+    @param to_normalize Whether to normalize the texts before aligning them.
+    @return For each row, its filename, the reference and transcribed words and their accuracy statistics.
+    """
+    texts = [text for _, _, reference_text, transcribed_text in rows for text in (reference_text, transcribed_text)]
+
+    if to_normalize:
+        # Normalize the reference and the transcribed texts of every row
+        texts = normalize.normalize_batch(
+            texts,
+            cnts=[index+1 for index, _, _, _ in rows for _ in range(2)],
+            types_of_text=['Reference', 'Transcribed'] * len(rows)
+        )
+
+    results = []
+    for (_, filename, _, _), reference_text, transcribed_text in zip(rows, texts[0::2], texts[1::2]):
+        reference_words = reference_text.split()
+        transcribed_words = transcribed_text.split()
+        results.append((filename, reference_words, transcribed_words,
+                        AccuracyStatistics(reference_words, transcribed_words, keep_pairs=False)))
+
+    return results
+
+
+def _init_worker(to_normalize: bool, normalization_cache_file: str, spelling_cache_file: str):
+    # Each worker process loads its own normalization models once, and only if they are needed
+    global _worker_normalize
+    PAIR_WEIGHT_CACHE.track_new_entries()
+    if to_normalize:
+        _worker_normalize = NormalizeText(cache_file=normalization_cache_file, spelling_cache_file=spelling_cache_file)
+
+
+# The results of a shard are returned with the word pair scores computed for it, to be merged into the parent's cache
+def _evaluate_shard(shard: List[EvaluationRow], to_normalize: bool) -> Tuple[List[EvaluationResult], list]:
+    results = evaluate_rows(_worker_normalize, shard, to_normalize)
+    return results, PAIR_WEIGHT_CACHE.take_new_entries()
+
+
+def _merge_shard(future) -> List[EvaluationResult]:
+    results, pair_weights = future.result()
+    PAIR_WEIGHT_CACHE.update(pair_weights)
+    return results
+
+
+def shards(rows: Iterable[EvaluationRow], chunk_size: int) -> Iterator[List[EvaluationRow]]:
+    rows = iter(rows)
+    while True:
+        shard = list(islice(rows, chunk_size))
+        if not shard:
+            return
+        yield shard
+
+
+def evaluate_rows_parallel(rows: Iterable[EvaluationRow],
+                           to_normalize: bool,
+                           num_workers: int,
+                           chunk_size: int = 64,
+                           normalization_cache_file: str = None,
+                           spelling_cache_file: str = None) -> Iterator[EvaluationResult]:
+    """
+    Evaluate rows across a pool of worker processes.
+
+    The rows are split into shards of chunk_size rows, each shard is normalized and aligned by one of the workers,
+    and the results are yielded in the original order of the rows. Merging them in this order gives exactly the same
+    totals as the serial evaluation.
+
+    The workers start from a copy of the word pair score cache of the parent process, and the scores they compute
+    are merged back into it with the results of every shard (so they are persisted by the parent).
+
+    @param rows The (index, filename, reference_text, transcribed_text) rows.
+    @param to_normalize Whether to normalize the texts before aligning them.
+    @param num_workers The number of worker processes.
+    @param chunk_size The number of rows sent to a worker at once.
+    @param normalization_cache_file The persistent normalization cache shared by the workers, if any.
+    @param spelling_cache_file The persistent spelling correction cache shared by the workers, if any.
+    @return The results of the rows, in order.
+    """
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                             initargs=(to_normalize, normalization_cache_file, spelling_cache_file)) as executor:
+        # Keep a bounded number of shards in flight, and collect them in the order they were submitted
+        pending = deque()
+        for shard in shards(rows, chunk_size):
+            pending.append(executor.submit(_evaluate_shard, shard, to_normalize))
+            if len(pending) >= 2 * num_workers:
+                yield from _merge_shard(pending.popleft())
+
+        while pending:
+            yield from _merge_shard(pending.popleft())
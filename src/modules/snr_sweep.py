@@ -0,0 +1,166 @@
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from modules.clip_store import ClipStore, load_clip
+from modules.noise_augmentation import as_saved_wav, clip_random, mix_with_noise
+from modules.noise_bank import NoiseBank
+from modules.parallel_evaluation import shards
+from modules.statistics_table import COUNT_COLUMNS, RATE_COLUMNS, StatisticsTable
+from modules.transcription_engine import TranscriptionEngine
+
+logger = logging.getLogger(__name__)
+
+# A condition of the sweep: (noise category, SNR in dB)
+SweepCondition = Tuple[str, float]
+
+# The mixture of a clip in one condition: (condition, mixed audio, background_file, start_point_sec)
+Mixture = Tuple[SweepCondition, np.ndarray, str, float]
+
+# The result of mixing a clip in all the conditions: (audio_path, mixtures, error message), where exactly one of the
+# mixtures and the error message is set
+SweepResult = Tuple[str, Optional[List[Mixture]], Optional[str]]
+
+# The noise banks and the clip store of the current worker process, created once by the pool initializer
+_worker_noise_banks = None
+_worker_clip_store = None
+
+
+def condition_name(condition: SweepCondition) -> str:
+    category, snr_db = condition
+    return f"{category}_snr{snr_db:g}"
+
+
+def _mix_shard(noise_banks: Dict[str, NoiseBank], clip_store: Optional[ClipStore], audio_paths: List[str],
+               conditions: List[SweepCondition], seed: int) -> List[SweepResult]:
+    results = []
+    for audio_path in audio_paths:
+        try:
+            # Decode and resample the clip (or read it from the clip store) once for all the conditions
+            speech, sr = load_clip(audio_path, clip_store)
+
+            mixtures = []
+            for category, snr_db in conditions:
+                # The generator is seeded the same way for all the SNRs, so within a noise category every SNR mixes
+                # the clip with the same noise segment, and only the level of the noise changes
+                mixed, noise_file, start_point_sec, _ = mix_with_noise(
+                    speech, noise_banks[category], clip_random(seed, audio_path), snr_db, snr_db)
+                # The mixture is clipped and quantized as if it was saved as a WAV file, as in Part 4
+                mixtures.append(((category, snr_db), as_saved_wav(mixed, sr), noise_file, start_point_sec))
+
+            results.append((audio_path, mixtures, None))
+        except Exception as e:
+            results.append((audio_path, None, str(e)))
+    return results
+
+
+def _init_worker(bank_dirs: Dict[str, str], store_dir: Optional[str]):
+    # Each worker process maps the noise banks and the clip store once (their pages are shared by all the workers)
+    global _worker_noise_banks, _worker_clip_store
+    _worker_noise_banks = {category: NoiseBank(bank_dir) for category, bank_dir in bank_dirs.items()}
+    _worker_clip_store = ClipStore(store_dir, read_only=True) if store_dir is not None else None
+
+
+def _mix_worker_shard(audio_paths: List[str], conditions: List[SweepCondition], seed: int) -> List[SweepResult]:
+    return _mix_shard(_worker_noise_banks, _worker_clip_store, audio_paths, conditions, seed)
+
+
+class SNRSweep:
+    """
+    Mixes every clip with background noise in a grid of conditions (noise categories x SNR values), decoding each
+    clean clip once, and transcribes all the mixtures with one transcription engine.
+
+    The mixing runs in this process or across a pool of num_workers processes, and the random choices of every clip
+    are seeded by the seed and the clip's filename, as in the augmentation engine. If a clip store is given, the
+    clean clips are read from it instead of being decoded.
+    """
+
+    def __init__(self, noise_banks: Dict[str, NoiseBank], snr_values: List[float], seed: int = 0,
+                 num_workers: int = 1, chunk_size: int = 8, clip_store: ClipStore = None):
+        self.noise_banks = noise_banks
+        self.clip_store = clip_store
+        self.snr_values = snr_values
+        self.seed = seed
+        self.num_workers = num_workers
+        self.chunk_size = chunk_size
+
+    @property
+    def conditions(self) -> List[SweepCondition]:
+        return [(category, snr_db) for category in self.noise_banks for snr_db in self.snr_values]
+
+    def mix(self, audio_paths: Iterable[str]) -> Iterator[SweepResult]:
+        """
+        Mix the given clips in all the conditions.
+
+        @param audio_paths The paths of the speech clips.
+        @return The (audio_path, mixtures, error message) of every clip, in the order of the clips.
+        """
+        args = (self.conditions, self.seed)
+
+        if self.num_workers <= 1:
+            for shard in shards(audio_paths, self.chunk_size):
+                yield from _mix_shard(self.noise_banks, self.clip_store, shard, *args)
+            return
+
+        bank_dirs = {category: noise_bank.bank_dir for category, noise_bank in self.noise_banks.items()}
+        store_dir = self.clip_store.store_dir if self.clip_store is not None else None
+        with ProcessPoolExecutor(max_workers=self.num_workers, initializer=_init_worker,
+                                 initargs=(bank_dirs, store_dir)) as executor:
+            # Keep a bounded number of shards in flight, and collect them in the order they were submitted
+            pending = deque()
+            for shard in shards(audio_paths, self.chunk_size):
+                pending.append(executor.submit(_mix_worker_shard, shard, *args))
+                if len(pending) >= 2 * self.num_workers:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+
+    def transcribe(self, clips: List[Tuple[str, str]], engine: TranscriptionEngine
+                   ) -> Tuple[Dict[SweepCondition, Dict[str, str]], Dict[SweepCondition, List[List[str]]]]:
+        """
+        Mix the given clips in all the conditions, and transcribe the mixtures as they are mixed.
+
+        @param clips The (filename, audio_path) of every clip.
+        @param engine The transcription engine.
+        @return The transcriptions of every condition by filename, and the augmentation log entries of every
+                condition (filename, background file, start point and SNR, as in the Part 4 augmentation log).
+        """
+        filenames = {audio_path: filename for filename, audio_path in clips}
+        transcriptions = {condition: {} for condition in self.conditions}
+        log_entries = {condition: [] for condition in self.conditions}
+
+        def mixtures():
+            for audio_path, clip_mixtures, error in self.mix(filenames):
+                if error is not None:
+                    logger.error("Error processing %s: %s", audio_path, error)
+                    continue
+
+                filename = filenames[audio_path]
+                for condition, audio, noise_file, start_point_sec in clip_mixtures:
+                    log_entries[condition].append([filename, noise_file, f"{start_point_sec:.2f}",
+                                                   f"{condition[1]:.2f}"])
+                    yield (condition, filename), audio
+
+        for done, ((condition, filename), transcribed_text) in enumerate(engine.transcribe(mixtures()), start=1):
+            if done % 100 == 0:
+                logger.info("Mixture %d out of %d", done, len(clips) * len(self.conditions))
+            transcriptions[condition][filename] = transcribed_text
+
+        return transcriptions, log_entries
+
+
+def sweep_statistics(statistics: Dict[SweepCondition, StatisticsTable]) -> List[dict]:
+    """
+    Get the consolidated statistics table of a sweep: a row of every condition, with its number of utterances, the
+    total counts of its utterances (N_gt, N_asr, M, S, I, D), and the averages of their rates over the utterances
+    (average_wer, average_recall, average_precision, average_f1_score), as in the AVERAGE row of its statistics.
+    """
+    rows = []
+    for (category, snr_db), table in statistics.items():
+        total, average = table.total(), table.average()
+        rows.append({'noise': category, 'snr': snr_db, 'utterances': len(table),
+                     **{column: total[column] for column in COUNT_COLUMNS},
+                     **{f"average_{column}": average[column] for column in RATE_COLUMNS}})
+    return rows
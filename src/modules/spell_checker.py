@@ -0,0 +1,87 @@
+import hashlib
+import json
+from typing import Iterable, List, Optional
+from modules.correction_rules import SuffixIndex
+from modules.lru_cache import LRUCache
+from modules.model_registry import get_phunspell
+from modules.sqlite_cache import SQLiteCache
+
+# Cached resolution of a word that needs no correction (no word is empty, so it can't be a correction)
+_CORRECT = ''
+
+
+class SpellChecker:
+    """
+    Resolves the spelling corrections of words with Phunspell, memoizing the result of every word.
+
+    A word needs no correction if it is in the Phunspell dictionary, or if it ends with one of the exception words
+    (OOV words that are correct anyway); otherwise it is corrected to the first Phunspell suggestion, or to itself if
+    there is no suggestion. The exceptions are checked with a suffix index, and the resolutions are cached in memory
+    and in an optional SQLite file, keyed by a fingerprint of the dictionary language and the exception words.
+    Phunspell itself is loaded only when a word is not cached.
+    """
+
+    def __init__(self, language: str, oov_words: List[str], cache_file: str = None,
+                 max_memory_entries: int = 200000, max_disk_entries: int = 10000000):
+        self.language = language
+
+        # Suffix index of the exception words
+        self.oov_suffixes = SuffixIndex()
+        for priority, oov_word in enumerate(oov_words):
+            self.oov_suffixes.add(oov_word, priority)
+
+        content = json.dumps({'language': language, 'oov_words': list(oov_words)}, ensure_ascii=False)
+        self.fingerprint = hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+        self.memory = LRUCache(max_size=max_memory_entries)
+        self.disk = SQLiteCache(cache_file, max_entries=max_disk_entries) if cache_file is not None else None
+
+    @property
+    def phunspell(self):
+        return get_phunspell(self.language)
+
+    def is_exception(self, word: str) -> bool:
+        return self.oov_suffixes.first_match(word) is not None
+
+    def _resolve(self, word: str) -> str:
+        if self.is_exception(word) or self.phunspell.lookup(word):
+            return _CORRECT
+        return next(self.phunspell.suggest(word), word)
+
+    def correct(self, word: str) -> Optional[str]:
+        """
+        Get the correction of the given word.
+
+        @param word The word to check.
+        @return The corrected word (which is the word itself if Phunspell has no suggestion for it),
+                or None if the word needs no correction.
+        """
+        resolution = self.memory.get(word)
+        if resolution is None:
+            key = self.fingerprint + ':' + word
+            resolution = self.disk.get(key) if self.disk is not None else None
+            if resolution is None:
+                resolution = self._resolve(word)
+                if self.disk is not None:
+                    self.disk.put(key, resolution)
+            self.memory.put(word, resolution)
+        return None if resolution == _CORRECT else resolution
+
+    def preresolve(self, words: Iterable[str]) -> int:
+        """
+        Resolve the distinct given words ahead of time (e.g. the vocabulary of a batch of texts), so correcting the
+        texts afterwards only hits the cache.
+
+        @param words The words to resolve.
+        @return The number of distinct words.
+        """
+        vocabulary = set(words)
+        for word in vocabulary:
+            self.correct(word)
+        return len(vocabulary)
+
+    def stats(self) -> dict:
+        return {
+            'memory': self.memory.stats(),
+            'disk': self.disk.stats() if self.disk is not None else None
+        }
@@ -0,0 +1,112 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+
+class SQLiteCache:
+    """
+    A persistent key-value cache stored in a SQLite database file.
+
+    Values are stored as JSON. If max_entries is set, the least recently used entries are evicted once the cache
+    grows beyond it. The cache counts its hits, misses and evictions, and is safe to use from multiple threads.
+    """
+
+    def __init__(self, filename: str, max_entries: int = None):
+        self.filename = filename
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries '
+            '(key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self._connection.commit()
+
+        # Keep the number of entries in memory, so the size cap is checked without scanning the table
+        self._entries = self._connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get the cached value of the given key and mark it as recently used.
+
+        @param key The key to look up.
+        @param default The value to return if the key is not cached.
+        @return The cached value, or the default value.
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._connection.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._connection.commit()
+            return json.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        """
+        Cache the given value, evicting the least recently used entries if the cache is full.
+
+        @param key The key to cache.
+        @param value The JSON-serializable value to cache.
+        """
+        serialized = json.dumps(value, ensure_ascii=False)
+        size = len(serialized.encode('utf-8'))
+        with self._lock:
+            cursor = self._connection.execute(
+                'UPDATE entries SET value = ?, size = ?, last_access = ? WHERE key = ?',
+                (serialized, size, time.time(), key)
+            )
+            if cursor.rowcount == 0:
+                self._connection.execute(
+                    'INSERT INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)',
+                    (key, serialized, size, time.time())
+                )
+                self._entries += 1
+
+            if self.max_entries is not None and self._entries > self.max_entries:
+                excess = self._entries - self.max_entries
+                self._connection.execute(
+                    'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access LIMIT ?)',
+                    (excess,)
+                )
+                self._entries -= excess
+                self.evictions += excess
+
+            self._connection.commit()
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        total = self.hits + self.misses
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'size_bytes': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total > 0 else 0
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
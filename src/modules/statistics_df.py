@@ -1,5 +1,5 @@
+import numpy as np
 import pandas as pd
-from IPython.display import display 
 
 class StatisticsDF:
     # This function is used to format floats as integers if they are whole numbers, otherwise as floats.
@@ -16,12 +16,29 @@ class StatisticsDF:
         else:
             return f'{val:.3f}' # Format non-whole numbers to one decimal place
 
+    # This function formats a whole column the same way as format_as_int_if_whole, without a Python call per cell.
+    # Integer and float columns are formatted with vectorized NumPy operations, and other columns cell by cell.
+    @staticmethod
+    def format_column(column: pd.Series) -> pd.Series:
+        if pd.api.types.is_integer_dtype(column.dtype):
+            return column.astype(np.int64).astype(str)
+        if not pd.api.types.is_float_dtype(column.dtype):
+            return column.apply(StatisticsDF.format_as_int_if_whole)
+
+        values = column.to_numpy(dtype=np.float64)
+        formatted = np.full(len(values), '', dtype=object)
+        whole = np.isfinite(values) & (np.floor(values) == values) & (np.abs(values) < 2 ** 63)
+        fraction = ~whole & ~np.isnan(values)
+        formatted[whole] = values[whole].astype(np.int64).astype(str)
+        formatted[fraction] = np.char.mod('%.3f', values[fraction])
+        return pd.Series(formatted, index=column.index, name=column.name)
+
     # This class is used to create a DataFrame with statistics and display it in a nice format.
     def __init__(self, dict_data: dict):
         self.df = pd.DataFrame(dict_data)
         self.df = self.df.reset_index(drop=True)
         for column in self.df:
-          self.df[column] = self.df[column].apply(self.format_as_int_if_whole)
+          self.df[column] = self.format_column(self.df[column])
 
     # This function is used to sort the DataFrame by the given columns in ascending or descending order.
     def sort_values(self, by: list[str], ascending: bool = False):
@@ -34,6 +51,8 @@ class StatisticsDF:
         return self
 
     def display(self):
+        # IPython is imported only when the statistics are displayed
+        from IPython.display import display
         display(self.df)
 
     def save(self, filename: str):
@@ -0,0 +1,64 @@
+from typing import Dict, List
+import numpy as np
+from modules.accuracy_statistics import AccuracyStatistics
+
+# The columns of the statistics of an utterance, in the order of AccuracyStatistics.to_dict
+COUNT_COLUMNS = ['N_gt', 'N_asr', 'M', 'S', 'I', 'D']
+RATE_COLUMNS = ['wer', 'recall', 'precision', 'f1_score']
+
+
+class StatisticsTable:
+    """
+    The statistics of every utterance, held column by column in preallocated NumPy arrays (int64 counts and
+    float64 rates) instead of a dict per utterance. The TOTAL and AVERAGE rows are computed over the columns.
+
+    The arrays grow geometrically if more utterances than the capacity are added.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.filenames = []
+        self.columns = {column: np.zeros(max(capacity, 1), dtype=np.int64) for column in COUNT_COLUMNS}
+        self.columns.update({column: np.zeros(max(capacity, 1), dtype=np.float64) for column in RATE_COLUMNS})
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def append(self, filename: str, statistics: AccuracyStatistics):
+        row = len(self.filenames)
+        if row == len(self.columns['N_gt']):
+            for column, values in self.columns.items():
+                self.columns[column] = np.concatenate([values, np.zeros(len(values) // 2 + 1, dtype=values.dtype)])
+
+        self.filenames.append(filename)
+        for column, value in statistics.to_dict().items():
+            self.columns[column][row] = value
+
+    def column(self, column: str) -> np.ndarray:
+        """
+        Get the values of a column of all the utterances (a view of the table).
+        """
+        return self.columns[column][:len(self)]
+
+    def total(self) -> Dict[str, np.number]:
+        """
+        Get the sum of every column. The sums are cumulative, so they add the utterances in order, exactly like
+        accumulating their AccuracyStatistics.
+        """
+        return {column: np.cumsum(self.column(column))[-1] if len(self) > 0 else values.dtype.type(0)
+                for column, values in self.columns.items()}
+
+    def average(self) -> Dict[str, float]:
+        """
+        Get the mean of every column over the utterances.
+        """
+        return {column: value / len(self) if len(self) > 0 else float('nan') for column, value in self.total().items()}
+
+    def to_dict(self) -> Dict[str, List]:
+        """
+        Get the columns of the table, followed by a TOTAL row and an AVERAGE row, e.g. for a StatisticsDF.
+        """
+        total, average = self.total(), self.average()
+        data = {'filename': self.filenames + ['TOTAL', 'AVERAGE']}
+        for column in self.columns:
+            data[column] = np.concatenate([self.column(column), [total[column], average[column]]])
+        return data
@@ -0,0 +1,54 @@
+import hashlib
+import json
+from typing import Optional, Union
+import numpy as np
+from modules.sqlite_cache import SQLiteCache
+
+# Audio files are hashed in blocks of this size
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+class TranscriptionCache:
+    """
+    A persistent, content-addressed cache of transcriptions.
+
+    The key of a transcription is a hash of the audio content (the bytes of the audio file, or the decoded samples)
+    together with the model id and the decoding settings, so a transcription is reused only for the same audio decoded
+    the same way, regardless of the file name or location. If the audio files are not decoded by the model's own
+    decoder, the decoder that is used is part of the key as well.
+    """
+
+    def __init__(self, filename: str, model_id: str, transcribe_options: dict, max_entries: int = 1000000,
+                 audio_decoder: str = None):
+        self.cache = SQLiteCache(filename, max_entries=max_entries)
+
+        # The model, audio decoder and decoding settings are part of every key
+        settings = {'model_id': model_id, **transcribe_options}
+        if audio_decoder is not None:
+            settings['audio_decoder'] = audio_decoder
+        self.settings = json.dumps(settings, sort_keys=True).encode('utf-8')
+
+    def key(self, audio: Union[str, np.ndarray]) -> str:
+        """
+        Compute the cache key of the given audio file path or decoded audio samples.
+        """
+        digest = hashlib.sha256(self.settings)
+
+        if isinstance(audio, np.ndarray):
+            digest.update(f'{audio.dtype.str}{audio.shape}'.encode('utf-8'))
+            digest.update(np.ascontiguousarray(audio).tobytes())
+        else:
+            with open(audio, 'rb') as f:
+                for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+                    digest.update(block)
+
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        return self.cache.get(key)
+
+    def put(self, key: str, transcribed_text: str):
+        self.cache.put(key, transcribed_text)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
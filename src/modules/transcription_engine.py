@@ -0,0 +1,228 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Hashable, Iterable, Iterator, Tuple, Union
+import numpy as np
+from modules.instrumentation import INSTRUMENTATION
+from modules.model_registry import get_whisper_model
+from modules.transcription_cache import TranscriptionCache
+
+# Whisper models work on 16kHz mono audio
+SAMPLING_RATE = 16000
+
+# The Whisper model used for transcribing Hebrew
+DEFAULT_MODEL_ID = 'ivrit-ai/whisper-large-v3-turbo-ct2'
+
+# The decoding settings of the transcriptions
+DEFAULT_TRANSCRIBE_OPTIONS = {
+    'language': 'he',
+    'temperature': 0.0,
+    'beam_size': 10
+}
+
+# An audio source is either the path of an audio file or its decoded 16kHz samples
+AudioSource = Union[str, np.ndarray]
+
+# Marks the end of the decoded audio queue
+_END = object()
+
+
+class WhisperModelFactory:
+    """
+    Creates faster_whisper models. A single model created with num_workers > 1 can run that many transcriptions
+    concurrently, sharing its weights, while cpu_threads sets the number of threads each transcription uses.
+
+    If shared is set, the model is taken from the process-wide model registry, so all the engines with the same
+    settings use one loaded model; otherwise every call loads a new model (e.g. for separate replicas).
+    """
+
+    def __init__(self, model_id: str = DEFAULT_MODEL_ID, cpu_threads: int = 0, num_workers: int = 1,
+                 shared: bool = True):
+        self.model_id = model_id
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.shared = shared
+
+    def __call__(self):
+        if self.shared:
+            return get_whisper_model(self.model_id, self.cpu_threads, self.num_workers)
+
+        import faster_whisper
+        return faster_whisper.WhisperModel(self.model_id, cpu_threads=self.cpu_threads, num_workers=self.num_workers)
+
+
+def decode_audio_file(path: str) -> np.ndarray:
+    """
+    Decode an audio file to 16kHz mono float32 samples, the same way faster_whisper does internally.
+    """
+    import faster_whisper
+    return faster_whisper.decode_audio(path, sampling_rate=SAMPLING_RATE)
+
+
+class TranscriptionEngine:
+    """
+    Transcribes audio clips on a pool of worker threads.
+
+    A decoder thread decodes the clips ahead of the workers into a bounded queue, so audio decoding overlaps with
+    inference. The workers share num_replicas models created by the model factory (the inference itself releases
+    the GIL). Any object with a faster_whisper-like transcribe(audio, **options) -> (segments, info) method can be
+    returned by the factory, e.g. a lightweight stand-in model for testing without network access.
+
+    If a transcription cache is given, the decoder thread looks up every clip in it before decoding the clip, and
+    the workers store the transcriptions of the clips that were not cached.
+    """
+
+    def __init__(self,
+                 model_factory: Callable[[], Any] = None,
+                 num_workers: int = 1,
+                 num_replicas: int = 1,
+                 queue_size: int = 8,
+                 audio_loader: Callable[[str], np.ndarray] = decode_audio_file,
+                 transcribe_options: dict = None,
+                 cache: TranscriptionCache = None):
+        self.model_factory = model_factory if model_factory is not None else WhisperModelFactory(num_workers=num_workers)
+        self.num_workers = num_workers
+        self.num_replicas = max(1, min(num_replicas, num_workers))
+        self.queue_size = queue_size
+        self.audio_loader = audio_loader
+        self.transcribe_options = transcribe_options if transcribe_options is not None else DEFAULT_TRANSCRIBE_OPTIONS
+        self.cache = cache
+
+        # The models are created on first use, by the first worker that needs each of them
+        self._models = [None] * self.num_replicas
+        self._models_lock = threading.Lock()
+
+        # Throughput statistics (cached clips are counted separately)
+        self.cached_clips = 0
+        self.clips = 0
+        self.audio_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def _get_model(self, worker_id: int):
+        replica = worker_id % self.num_replicas
+        with self._models_lock:
+            if self._models[replica] is None:
+                self._models[replica] = self.model_factory()
+            return self._models[replica]
+
+    def _load_audio(self, audio: AudioSource) -> np.ndarray:
+        if isinstance(audio, np.ndarray):
+            return audio
+        return self.audio_loader(audio)
+
+    def transcribe_audio(self, model, audio: np.ndarray) -> str:
+        """
+        Transcribe decoded audio with the given model, joining the texts of all its segments.
+        """
+        segs, _ = model.transcribe(audio, **self.transcribe_options)
+        return ' '.join([s.text for s in segs])
+
+    def transcribe(self, items: Iterable[Tuple[Hashable, AudioSource]]) -> Iterator[Tuple[Hashable, str]]:
+        """
+        Transcribe the given clips, yielding each result as soon as it is ready.
+
+        @param items Pairs of (key, audio source), where the audio source is a file path or decoded 16kHz samples.
+        @return Pairs of (key, transcribed text), in the order the transcriptions complete.
+        """
+        audio_queue = queue.Queue(maxsize=self.queue_size)
+        results_queue = queue.Queue()
+        stop = threading.Event()
+        start_time = time.perf_counter()
+
+        def put(item) -> bool:
+            # Put an item in the bounded queue, giving up if the consumer stopped early
+            while not stop.is_set():
+                try:
+                    audio_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def decoder():
+            try:
+                for key, audio in items:
+                    # Take the transcription from the cache if possible, skipping decoding and inference
+                    cache_key = None
+                    if self.cache is not None:
+                        with INSTRUMENTATION.stage('transcription.cache_lookup'):
+                            cache_key = self.cache.key(audio)
+                            cached_text = self.cache.get(cache_key)
+                        if cached_text is not None:
+                            results_queue.put((key, cached_text, None))
+                            continue
+
+                    with INSTRUMENTATION.stage('transcription.decode_audio'):
+                        decoded = self._load_audio(audio)
+                    if not put((key, cache_key, decoded)):
+                        return
+            except BaseException as e:
+                results_queue.put(e)
+            finally:
+                for _ in range(self.num_workers):
+                    put(_END)
+
+        def worker(worker_id: int):
+            try:
+                model = self._get_model(worker_id)
+                while True:
+                    try:
+                        item = audio_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        if stop.is_set():
+                            break
+                        continue
+                    if item is _END:
+                        break
+                    key, cache_key, audio = item
+                    with INSTRUMENTATION.stage('transcription.inference'):
+                        transcribed_text = self.transcribe_audio(model, audio)
+                    if cache_key is not None:
+                        self.cache.put(cache_key, transcribed_text)
+                    results_queue.put((key, transcribed_text, len(audio) / SAMPLING_RATE))
+            except BaseException as e:
+                results_queue.put(e)
+            finally:
+                results_queue.put(_END)
+
+        threads = [threading.Thread(target=decoder, daemon=True)]
+        threads += [threading.Thread(target=worker, args=(worker_id,), daemon=True)
+                    for worker_id in range(self.num_workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            finished_workers = 0
+            while finished_workers < self.num_workers:
+                result = results_queue.get()
+                if result is _END:
+                    finished_workers += 1
+                    continue
+                if isinstance(result, BaseException):
+                    raise result
+
+                key, transcribed_text, audio_seconds = result
+                if audio_seconds is None:
+                    self.cached_clips += 1
+                    INSTRUMENTATION.count('transcription.cached_clips')
+                else:
+                    self.clips += 1
+                    self.audio_seconds += audio_seconds
+                    INSTRUMENTATION.count('transcription.clips')
+                yield key, transcribed_text
+        finally:
+            stop.set()
+            self.wall_seconds += time.perf_counter() - start_time
+
+    def stats(self) -> dict:
+        """
+        Get the throughput of the engine: clips per second, and the real time factor (processing time / audio time).
+        """
+        return {
+            'cached_clips': self.cached_clips,
+            'clips': self.clips,
+            'audio_seconds': self.audio_seconds,
+            'wall_seconds': self.wall_seconds,
+            'clips_per_sec': self.clips / self.wall_seconds if self.wall_seconds > 0 else 0,
+            'real_time_factor': self.wall_seconds / self.audio_seconds if self.audio_seconds > 0 else 0
+        }
@@ -0,0 +1,132 @@
+from typing import Optional, Sequence, Tuple
+import numpy as np
+from modules.alignment_ops import OP_NULL, OP_PAIR, OP_INS, OP_DEL
+from modules.edit_weights import EditWeights, GeneralEditWeights, LevenshteinWeights, UniformWeights
+
+# Edit weight classes whose weights are constants and therefore can be computed on whole anti-diagonals at once.
+# Subclasses are deliberately not matched, as they may override the weight functions (e.g. NestedUniformWeights).
+CONSTANT_WEIGHT_CLASSES = (GeneralEditWeights, LevenshteinWeights, UniformWeights)
+
+# Below this number of matrix cells the per-diagonal NumPy overhead outweighs the pure-Python loop.
+MIN_WAVEFRONT_CELLS = 900
+
+
+def supports_weights(weights: EditWeights) -> bool:
+    """
+    Check whether the given edit weights can be handled by the vectorized wavefront engine.
+
+    @param weights The edit weights.
+    @return True if the weights object is exactly one of the constant-weight classes.
+    """
+    return type(weights) in CONSTANT_WEIGHT_CLASSES
+
+
+def encode_sequences(first_seq: Sequence, second_seq: Sequence) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Encode the objects of both sequences to integer ids over a shared vocabulary, so equal objects get equal ids.
+
+    @param first_seq The first sequence of aligned objects.
+    @param second_seq The second sequence of aligned objects.
+    @return The pair of id arrays, or None if the objects are not hashable.
+    """
+    vocab = {}
+    try:
+        first_ids = np.fromiter((vocab.setdefault(obj, len(vocab)) for obj in first_seq),
+                                dtype=np.int64, count=len(first_seq))
+        second_ids = np.fromiter((vocab.setdefault(obj, len(vocab)) for obj in second_seq),
+                                 dtype=np.int64, count=len(second_seq))
+    except TypeError:
+        return None
+
+    return first_ids, second_ids
+
+
+def wavefront_fill(first_ids: np.ndarray,
+                   second_ids: np.ndarray,
+                   weights: GeneralEditWeights,
+                   band: Optional[int] = None) -> Tuple[float, np.ndarray]:
+    """
+    Fill the alignment matrices of two encoded sequences one anti-diagonal at a time.
+
+    All the entries of an anti-diagonal (i + j = d) depend only on the two previous anti-diagonals, so each of them
+    is computed with a handful of vectorized NumPy operations. The operations are compared in the same order and with
+    the same strict comparisons as the pure-Python loop, so ties are broken identically.
+
+    If a band is given, only the entries with |i - j| <= band are computed. The band is widened to the length
+    difference of the sequences so that the last entry is always reachable. A banded alignment is optimal only if
+    the optimal path stays within the band.
+
+    @param first_ids The integer ids of the first sequence.
+    @param second_ids The integer ids of the second sequence.
+    @param weights The constant edit weights.
+    @param band The maximal distance of a computed entry from the main diagonal, or None for the full matrix.
+    @return The computed score of the optimal global alignment.
+    @return The (m+1)x(n+1) matrix of back pointers.
+    """
+    first_len = len(first_ids)
+    second_len = len(second_ids)
+    row_len = second_len + 1
+
+    match_wgt = float(weights.match_weight)
+    subst_wgt = float(weights.substitution_weight)
+    insdel_wgt = float(weights.insdel_weight)
+
+    if band is not None:
+        band = max(band, abs(first_len - second_len))
+
+    # Entries outside of the band are never reached, so they keep a score of minus infinity.
+    scores_mat = np.full((first_len + 1, second_len + 1), -np.inf if band is not None else 0.0)
+    ops_mat = np.zeros((first_len + 1, second_len + 1), dtype=np.int8)
+
+    # Set up the initial matrix entry.
+    scores_mat[0, 0] = 0
+    ops_mat[0, 0] = OP_NULL
+
+    # Fill the 0'th row and column. The cumulative sum adds the weights sequentially, just like the pure-Python loop.
+    row_end = second_len if band is None else min(second_len, band)
+    col_end = first_len if band is None else min(first_len, band)
+    scores_mat[0, 1:row_end + 1] = np.cumsum(np.full(row_end, insdel_wgt))
+    ops_mat[0, 1:row_end + 1] = OP_INS
+    scores_mat[1:col_end + 1, 0] = np.cumsum(np.full(col_end, insdel_wgt))
+    ops_mat[1:col_end + 1, 0] = OP_DEL
+
+    # Work on flat views, so each neighbour of an entry is a constant offset away.
+    scores_flat = scores_mat.reshape(-1)
+    ops_flat = ops_mat.reshape(-1)
+
+    for diag in range(2, first_len + second_len + 1):
+        # The rows of the inner entries on the current anti-diagonal.
+        first_row = max(1, diag - second_len)
+        last_row = min(first_len, diag - 1)
+        if band is not None:
+            first_row = max(first_row, (diag - band + 1) // 2)
+            last_row = min(last_row, (diag + band) // 2)
+        if first_row > last_row:
+            continue
+
+        rows = np.arange(first_row, last_row + 1)
+        cols = diag - rows
+        entries = rows * row_len + cols
+
+        # Accumulate the match or substitution weight with the weight of the corresponding predecessor entry.
+        pair_wgts = np.where(first_ids[rows - 1] == second_ids[cols - 1], match_wgt, subst_wgt)
+        max_wgt = scores_flat[entries - row_len - 1] + pair_wgts
+        best_op = np.full(len(entries), OP_PAIR, dtype=np.int8)
+
+        # Accumulate the current insertion weight with the weight of the corresponding predecessor entry.
+        ins_wgt = scores_flat[entries - 1] + insdel_wgt
+        is_better = ins_wgt > max_wgt
+        max_wgt = np.where(is_better, ins_wgt, max_wgt)
+        best_op[is_better] = OP_INS
+
+        # Accumulate the current deletion weight with the weight of the corresponding predecessor entry.
+        del_wgt = scores_flat[entries - row_len] + insdel_wgt
+        is_better = del_wgt > max_wgt
+        max_wgt = np.where(is_better, del_wgt, max_wgt)
+        best_op[is_better] = OP_DEL
+
+        # Store the selected maximum weights and their corresponding operations.
+        scores_flat[entries] = max_wgt
+        ops_flat[entries] = best_op
+
+    return scores_mat[first_len, second_len], ops_mat
@@ -1,88 +1,181 @@
 import os
-import faster_whisper
-import pandas as pd
+from typing import Callable, Iterable, List, Tuple
+from modules.transcription_engine import AudioSource, TranscriptionEngine, WhisperModelFactory, DEFAULT_TRANSCRIBE_OPTIONS
+from modules.transcription_cache import TranscriptionCache
+from modules.corpus_io import TsvWriter, iter_tsv_rows, read_tsv_rows, read_clip_durations
+from modules.clip_store import CLIP_DECODER, ClipStore
+from modules.clip_schedule import ProgressEstimate, longest_first
+from modules.instrumentation import INSTRUMENTATION
+from modules.logging_config import configure_logging
 
 
 class Part1:
-    def __init__(self, referenced_file: str, base_clips_dir: str, output_file: str):
+    def __init__(self, referenced_file: str, base_clips_dir: str, output_file: str,
+                 num_workers: int = 1, model_factory=None, transcription_cache_file: str = None,
+                 clip_store: ClipStore = None, clip_durations_file: str = None):
         # Set the referenced file and the base clips directory
         self.referenced_file = referenced_file
         self.base_clips_dir = base_clips_dir
         self.output_file = output_file
-        
-        # Load the Whisper model
-        self.model = faster_whisper.WhisperModel('ivrit-ai/whisper-large-v3-turbo-ct2')
+        self.clip_store = clip_store
+
+        # The durations of the clips in seconds by filename (from the clip_durations.tsv of the corpus, if given),
+        # used to schedule the clips longest-first and to estimate the time remaining
+        self.clip_durations_file = clip_durations_file
+        self.clip_durations = {}
+
+        # By default, a single Whisper model serves all the workers concurrently, splitting the CPU cores between them
+        if model_factory is None:
+            model_factory = WhisperModelFactory(
+                cpu_threads=max(1, (os.cpu_count() or 1) // num_workers),
+                num_workers=num_workers
+            )
+
+        # Reuse the transcriptions of previous runs of the same audio with the same model and decoding settings.
+        # The model is identified by the model_id of the factory, which a custom factory must therefore set (e.g. as
+        # an attribute of the function), so different models never share cached transcriptions.
+        self.transcription_cache = None
+        if transcription_cache_file is not None:
+            model_id = getattr(model_factory, 'model_id', None)
+            if not model_id:
+                raise ValueError("A model factory used with a transcription cache must have a model_id")
+            self.transcription_cache = TranscriptionCache(
+                transcription_cache_file,
+                model_id=model_id,
+                transcribe_options=DEFAULT_TRANSCRIBE_OPTIONS,
+                audio_decoder=CLIP_DECODER if clip_store is not None else None
+            )
+
+        # Create the transcription engine (the Whisper model is loaded by the engine on first use).
+        # If there is a clip store, the engine reads the decoded clips from it, decoding and storing the missing ones.
+        engine_options = {'audio_loader': clip_store.load} if clip_store is not None else {}
+        self.engine = TranscriptionEngine(model_factory=model_factory, num_workers=num_workers,
+                                          cache=self.transcription_cache, **engine_options)
 
         # List to store the transcriptions
         self.transciptions = []
 
     def read_referenced_file(self):
-        # Read the Ground Truth file
-        df_in = pd.read_csv(self.referenced_file, sep='\t')
+        # Stream the rows of the Ground Truth file
+        video_format = None
+        for path, sentence in iter_tsv_rows(self.referenced_file, ['path', 'sentence']):
+            # Get the video format from the first row of the Ground Truth file
+            if video_format is None:
+                video_format = path.split('.')[-1]
+                print(f"Video format: {video_format}")
 
-        # Get the video format from the first row of the Ground Truth file
-        video_format = df_in.iloc[0]['path'].split('.')[-1]
-        print(f"Video format: {video_format}")
-
-        # Iterate over the rows of the Ground Truth file
-        for _, row in df_in.iterrows():        
             # Add the filename and the reference text to the list of transcriptions
             self.transciptions.append({
-                'filename': row['path'].split('.')[0],
-                'reference_text': row['sentence']
+                'filename': path.split('.')[0],
+                'reference_text': sentence
             })
 
         print(self.transciptions[:10])
 
-        return video_format
+        # Load the durations of the clips up front
+        if self.clip_durations_file is not None:
+            self.clip_durations = read_clip_durations(self.clip_durations_file)
+            print(f"Read the durations of {len(self.clip_durations)} clips")
 
-    def transcribe_clips(self, video_format: str, limit: int = 0):
-        cnt = 0
+        return video_format
 
+    # Decode the referenced clips into the clip store ahead of transcribing them, across num_workers processes.
+    # The durations of the clips (if they were read) are used to reserve the room of the clips at once.
+    def preprocess_clips(self, video_format: str, num_workers: int = 1):
+        if self.clip_store is None:
+            return
+
+        paths = [os.path.join(self.base_clips_dir, f"{transription['filename']}.{video_format}")
+                 for transription in self.transciptions]
+        decoded = self.clip_store.build(paths, self.clip_durations, num_workers=num_workers)
+        print(f"Decoded {decoded} clips, {len(self.clip_store)} clips in the clip store")
+
+    def read_completed_transcriptions(self) -> dict:
+        # Read the transcriptions already written to the output file by a previous (possibly interrupted) run.
+        # An empty transcription (e.g. of a silent clip) was written, so only rows without the column are not done.
+        return {row['filename']: row['transcribed_text'] for row in read_tsv_rows(self.output_file)
+                if row.get('transcribed_text') is not None}
+
+    # The transcriptions are appended to the output file as they complete, and flushed every flush_every clips.
+    # If resume is set, clips that already have a transcription in the output file are not transcribed again.
+    # By default the clips are read from the base clips directory. Otherwise, clip_audio gets the filenames of the
+    # clips to transcribe and yields (filename, audio) pairs, e.g. to stream audio generated in memory.
+    # If the durations of the clips were read, the clips are transcribed longest-first, so the workers (which take
+    # the next clip from a shared queue) finish together on short clips, and the time remaining is reported.
+    @INSTRUMENTATION.timed('part1.transcribe_clips')
+    def transcribe_clips(self, video_format: str, limit: int = 0, flush_every: int = 10, resume: bool = True,
+                         clip_audio: Callable[[List[str]], Iterable[Tuple[str, AudioSource]]] = None):
         if limit == 0:
             limit = len(self.transciptions)
 
-        print(f"Total of {limit} clips to transcribe")
-
-        # Iterate over the transcriptions and transcribe the clips
-        for transription in self.transciptions[:limit]:
-            if ((cnt+1) % 10 == 0):
-                print(f"Clip {cnt+1} out of {limit}")
-            
-            # Transcribe the clip
-            segs, _ = self.model.transcribe(
-                os.path.join(self.base_clips_dir, f"{transription['filename']}.{video_format}"),
-                language='he',
-                temperature=0.0,
-                beam_size=10)
-
-            # Get the text from the transcriptions
-            texts = [s.text for s in segs]
-
-            # Join the text from the transcriptions into a single string
-            transcribed_text = ' '.join(texts)
-
-            # Add the transcribed text to the transcription
-            self.transciptions[cnt]['transcribed_text'] = transcribed_text
-
-            cnt+=1
+        # Take the transcriptions of the previous runs, and transcribe only the remaining clips
+        completed = self.read_completed_transcriptions() if resume else {}
+        remaining = []
+        for cnt, transription in enumerate(self.transciptions[:limit]):
+            if transription['filename'] in completed:
+                transription['transcribed_text'] = completed[transription['filename']]
+            else:
+                remaining.append(cnt)
+
+        print(f"Total of {limit} clips, {len(remaining)} left to transcribe")
+
+        durations = {cnt: self.clip_durations[self.transciptions[cnt]['filename']] for cnt in remaining
+                     if self.transciptions[cnt]['filename'] in self.clip_durations}
+        if durations:
+            remaining = longest_first(remaining, durations)
+        progress = ProgressEstimate(remaining, durations)
+
+        # The clips to transcribe, keyed by their index in the list of transcriptions
+        if clip_audio is None:
+            clips = ((cnt, os.path.join(self.base_clips_dir, f"{self.transciptions[cnt]['filename']}.{video_format}"))
+                     for cnt in remaining)
+        else:
+            indices = {self.transciptions[cnt]['filename']: cnt for cnt in remaining}
+            clips = ((indices[filename], audio) for filename, audio in clip_audio(list(indices)))
+
+        with TsvWriter(self.output_file, ['filename', 'reference_text', 'transcribed_text'],
+                       append=resume, flush_every=flush_every) as writer:
+
+            # Iterate over the transcribed clips as they complete
+            for done, (cnt, transcribed_text) in enumerate(self.engine.transcribe(clips), start=1):
+                progress.complete(cnt)
+                if done % 10 == 0:
+                    print(f"Clip {done} out of {len(remaining)}" + (f" ({progress})" if durations else ""))
+
+                # Add the transcribed text to the transcription and append it to the output file
+                self.transciptions[cnt]['transcribed_text'] = transcribed_text
+                writer.write_row(self.transciptions[cnt])
+
+        print(f"Transcription throughput: {self.engine.stats()}")
+        if self.transcription_cache is not None:
+            print(f"Transcription cache: {self.transcription_cache.stats()}")
 
     def save_transcriptions(self):
-        # Create a DataFrame from the transcriptions
-        df_out = pd.DataFrame(self.transciptions)
-
-        # Save the DataFrame to a TSV file
-        df_out.to_csv(self.output_file, sep='\t', index=False)
+        # Rewrite the output file with all the transcriptions, in the order of the referenced file
+        with TsvWriter(self.output_file, ['filename', 'reference_text', 'transcribed_text'],
+                       append=False, flush_every=10000) as writer:
+            for transription in self.transciptions:
+                writer.write_row(transription)
 
 def main():
+    configure_logging()
+
     # Create a new Part1 object
     part1 = Part1(
         referenced_file=os.path.join('..', 'cv-corpus-24.0-2025-12-05', 'he', 'test.tsv'),
         base_clips_dir=os.path.join('..', 'cv-corpus-24.0-2025-12-05', 'he', 'clips'),
-        output_file=os.path.join('results', 'part1_transcriptions.tsv')
+        output_file=os.path.join('results', 'part1_transcriptions.tsv'),
+        # Run concurrent transcriptions of 4 CPU threads each
+        num_workers=max(1, (os.cpu_count() or 1) // 4),
+        transcription_cache_file=os.path.join('cache', 'transcriptions.sqlite'),
+        # Decode every clip once, and read it from the clip store in the next runs
+        clip_store=ClipStore(os.path.join('cache', 'clips')),
+        # Transcribe the clips longest-first, and estimate the time remaining from their durations
+        clip_durations_file=os.path.join('..', 'cv-corpus-24.0-2025-12-05', 'he', 'clip_durations.tsv')
     )
 
     video_format = part1.read_referenced_file()
+    part1.preprocess_clips(video_format, num_workers=os.cpu_count() or 1)
     part1.transcribe_clips(video_format)
     part1.save_transcriptions()
 
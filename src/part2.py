@@ -1,94 +1,131 @@
-import pandas as pd
 from modules.statistics_df import StatisticsDF
+from modules.statistics_table import StatisticsTable
+from modules.corpus_io import TsvWriter, iter_tsv_rows
 from modules.accuracy_statistics import AccuracyStatistics
 from modules.normalize_text import NormalizeText
+from modules.edit_weights import PAIR_WEIGHT_CACHE
+from modules.parallel_evaluation import evaluate_rows, evaluate_rows_parallel, shards
+from modules.logging_config import configure_logging
 import os
 
 class Part2:
-    def __init__(self, input_transcriptions_file: str, output_statistics_file: str, output_transcriptions_file: str):
+    def __init__(self, input_transcriptions_file: str, output_statistics_file: str, output_transcriptions_file: str,
+                 pair_weight_cache_file: str = None, normalization_cache_file: str = None,
+                 spelling_cache_file: str = None, correction_audit_file: str = None):
         self.input_transcriptions_file = input_transcriptions_file
         self.output_statistics_file = output_statistics_file
         self.output_transcriptions_file = output_transcriptions_file
-
-        # Create a new NormalizeText object
-        self.normalize = NormalizeText()
-
-        self.statistics = []
-        self.normalized_text = []
-
-    def process_transcriptions(self, to_normalize: bool = False):
-        df_in = pd.read_csv(self.input_transcriptions_file, sep='\t')
-
-        # Create a new AccuracyStatistics object
+        self.pair_weight_cache_file = pair_weight_cache_file
+        self.normalization_cache_file = normalization_cache_file
+        self.spelling_cache_file = spelling_cache_file
+
+        # Start with the word pair scores of previous runs, if they were persisted
+        if self.pair_weight_cache_file is not None:
+            PAIR_WEIGHT_CACHE.load(self.pair_weight_cache_file)
+
+        # Create a new NormalizeText object, reusing the texts normalized and the words corrected by previous runs
+        # The corrections it makes are written to the correction audit file (rewritten by every run), if it is given
+        self.normalize = NormalizeText(cache_file=normalization_cache_file, spelling_cache_file=spelling_cache_file,
+                                       audit_file=correction_audit_file)
+
+        self.statistics = StatisticsTable()
+
+    # Rows are evaluated chunk_size rows at a time (their texts are normalized in batches),
+    # either in this process or across a pool of num_workers processes.
+    # The results are merged in the order of the rows, so the output is identical to the serial evaluation.
+    # The transcriptions file is streamed read_chunk_size rows at a time, and the normalized texts are written to
+    # the output transcriptions file as they are evaluated, so the memory doesn't grow with the texts.
+    # The errors are counted exactly, or by an approximate counter of error_capacity pairs if it is given.
+    # The corrections of the normalization are audited in the serial evaluation only (not by the worker processes).
+    # If preresolve_vocabulary is set, the spelling corrections of the vocabulary of the whole file are resolved in
+    # one pass before the rows are normalized (the workers share them through the spelling cache file, if any).
+    def process_transcriptions(self, to_normalize: bool = False, num_workers: int = 1, chunk_size: int = 64,
+                               read_chunk_size: int = 10000, error_capacity: int = None,
+                               preresolve_vocabulary: bool = True):
+        self.statistics = StatisticsTable()
+
+        if to_normalize and preresolve_vocabulary:
+            num_words = self.normalize.preresolve_vocabulary(
+                text for row in iter_tsv_rows(self.input_transcriptions_file, ['reference_text', 'transcribed_text'],
+                                              read_chunk_size)
+                for text in row)
+            print(f"Pre-resolved the spelling of {num_words} words")
+
+        # Create a new AccuracyStatistics object, with a running count of the errors of all the rows
         statistics_total = AccuracyStatistics()
+        statistics_total.count_errors(error_capacity)
+
+        rows = ((index, filename, reference_text, transcribed_text)
+                for index, (filename, reference_text, transcribed_text) in enumerate(iter_tsv_rows(
+                    self.input_transcriptions_file, ['filename', 'reference_text', 'transcribed_text'],
+                    read_chunk_size)))
 
         # Iterate over the rows of the transcriptions file
-        for index, row in df_in.iterrows():
-
-            if to_normalize:
-                # Normalize the reference text
-                reference_text = self.normalize.normalize_text(
-                    text=row['reference_text'], 
-                    cnt=index+1, 
-                    type_of_text='Reference'
-                ).split()
-                
-                # Normalize the transcribed text
-                transcribed_text = self.normalize.normalize_text(
-                    text=row['transcribed_text'], 
-                    cnt=index+1, 
-                    type_of_text='Transcribed'
-                ).split()
-            else:
-                reference_text = row['reference_text'].split()
-                transcribed_text = row['transcribed_text'].split()
-
-
-            # Create a new AccuracyStatistics object for the current row
-            accuracy_statistics = AccuracyStatistics(reference_text, transcribed_text)
-            statistics_total += accuracy_statistics
-            self.statistics.append({'filename': row['filename'], **accuracy_statistics.to_dict()})
-            
-            if to_normalize:
-                self.normalized_text.append({
-                    'filename': row['filename'],
-                    'reference_text': ' '.join(reference_text),
-                    'transcribed_text': ' '.join(transcribed_text)
-                })
+        if num_workers > 1:
+            results = evaluate_rows_parallel(rows, to_normalize, num_workers, chunk_size,
+                                             normalization_cache_file=self.normalization_cache_file,
+                                             spelling_cache_file=self.spelling_cache_file)
+        else:
+            results = (result for shard in shards(rows, chunk_size)
+                       for result in evaluate_rows(self.normalize, shard, to_normalize))
+
+        normalized_writer = None
+        if to_normalize:
+            normalized_writer = TsvWriter(self.output_transcriptions_file,
+                                          ['filename', 'reference_text', 'transcribed_text'],
+                                          append=False, flush_every=read_chunk_size)
+
+        try:
+            for filename, reference_text, transcribed_text, accuracy_statistics in results:
+                # Accumulate the AccuracyStatistics object of the current row
+                statistics_total += accuracy_statistics
+                self.statistics.append(filename, accuracy_statistics)
+
+                if normalized_writer is not None:
+                    normalized_writer.write_row({
+                        'filename': filename,
+                        'reference_text': ' '.join(reference_text),
+                        'transcribed_text': ' '.join(transcribed_text)
+                    })
+        finally:
+            if normalized_writer is not None:
+                normalized_writer.close()
+            self.normalize.audit.close()
 
         return statistics_total
 
-    def save_statistics(self, statistics_total: AccuracyStatistics):
-        # Calculate the average statistics
-        statistics_avg = {k: v / len(self.statistics) for k, v in statistics_total.to_dict().items()}
-        self.statistics.append({'filename': 'TOTAL', **statistics_total.to_dict()})
-        self.statistics.append({'filename': 'AVERAGE', **statistics_avg})
-
-        # Create a new StatisticsDF object from the list of statistics and display and save it
-        df_out = StatisticsDF(self.statistics)
+    def save_statistics(self):
+        # Create a new StatisticsDF object from the statistics of the rows, followed by their total and average
+        df_out = StatisticsDF(self.statistics.to_dict())
         df_out.display()
         df_out.save(self.output_statistics_file)
 
-        if len(self.normalized_text) > 0:
-            # Create a new DataFrame from the normalized text and save it to a TSV file
-            df_normalized = pd.DataFrame(self.normalized_text)
-            df_normalized.to_csv(self.output_transcriptions_file, index=False, sep='\t')
+        # Persist the word pair scores for the next runs
+        print(f"Word pair score cache: {PAIR_WEIGHT_CACHE.stats()}")
+        print(f"Corrections by step: {self.normalize.audit.stats()}")
+        if self.pair_weight_cache_file is not None:
+            PAIR_WEIGHT_CACHE.save(self.pair_weight_cache_file)
 
 
 def main():
+    configure_logging()
+
     part2 = Part2(
         input_transcriptions_file=os.path.join('results', 'part1_transcriptions.tsv'),
         output_statistics_file=os.path.join('results', 'part2_statistics.csv'),
-        output_transcriptions_file=os.path.join('results', 'part2_transcriptions.tsv')
+        output_transcriptions_file=os.path.join('results', 'part2_transcriptions.tsv'),
+        pair_weight_cache_file=os.path.join('cache', 'pair_weight_cache.json')
     )
-    statistics_total = part2.process_transcriptions(to_normalize=False)
+    # The ~1k rows are aligned without normalization in this process, as starting a process pool would take longer
+    # (larger corpora can pass num_workers to evaluate them across processes)
+    statistics_total = part2.process_transcriptions(to_normalize=False, num_workers=1)
 
     # Iterate over the frequent errors and print the most frequent errors
     for word_pair, num in statistics_total.frequent_errors(k=20):
         print('-> "%s" replaced by "%s" %d times.' %
         (word_pair[0], word_pair[1], num))
 
-    part2.save_statistics(statistics_total)
+    part2.save_statistics()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,11 +1,18 @@
 from part2 import Part2
+from modules.logging_config import configure_logging
 import os
 
 def main():
+    configure_logging()
+
     part2 = Part2(
         input_transcriptions_file=os.path.join('results', 'part1_transcriptions.tsv'),
         output_statistics_file=os.path.join('results', 'part3_statistics.csv'),
-        output_transcriptions_file=os.path.join('results', 'part3_transcriptions.tsv')
+        output_transcriptions_file=os.path.join('results', 'part3_transcriptions.tsv'),
+        pair_weight_cache_file=os.path.join('cache', 'pair_weight_cache.json'),
+        normalization_cache_file=os.path.join('cache', 'normalization.sqlite'),
+        spelling_cache_file=os.path.join('cache', 'spelling.sqlite'),
+        correction_audit_file=os.path.join('results', 'part3_corrections.tsv')
     )
     statistics_total = part2.process_transcriptions(to_normalize=True)
 
@@ -14,7 +21,7 @@ def main():
         print('-> "%s" replaced by "%s" %d times.' %
         (word_pair[0], word_pair[1], num))
 
-    part2.save_statistics(statistics_total)
+    part2.save_statistics()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,21 +1,31 @@
 
 import os
-import random
-import numpy as np
-import soundfile as sf
-from scipy.signal import decimate
 from part1 import Part1
 from part2 import Part2
+from modules.noise_bank import NoiseBank
+from modules.noise_augmentation import AugmentationEngine
+from modules.clip_store import ClipStore
+from modules.corpus_io import iter_tsv_rows, read_clip_durations
+from modules.logging_config import configure_logging
 
 # Configuration
 TEST_TSV = "../cv-corpus-24.0-2025-12-05/he/test.tsv"
 CLIPS_DIR = "../cv-corpus-24.0-2025-12-05/he/clips"
+CLIP_DURATIONS_TSV = "../cv-corpus-24.0-2025-12-05/he/clip_durations.tsv"
 NOISE_DIR = "../musan/noise/free-sound"
 OUTPUT_DIR = "../musan/noisy_clips"
 LOG_FILE = "results/part4_augmentation_log.tsv"
 NOISY_TRANSCRIPTIONS_FILE = "results/part4_noisy_transcriptions.tsv"
 STATISTICS_FILE = "results/part4_statistics.csv"
 NORMALIZED_TRANSCRIPTIONS_FILE = "results/part4_normalized_transcriptions.tsv"
+CORRECTION_AUDIT_FILE = "results/part4_corrections.tsv"
+PAIR_WEIGHT_CACHE_FILE = "cache/pair_weight_cache.json"
+TRANSCRIPTION_CACHE_FILE = "cache/transcriptions.sqlite"
+NORMALIZATION_CACHE_FILE = "cache/normalization.sqlite"
+SPELLING_CACHE_FILE = "cache/spelling.sqlite"
+NOISE_BANKS_DIR = "cache/noise_banks"
+NOISE_BANK_DIR = os.path.join(NOISE_BANKS_DIR, os.path.basename(NOISE_DIR))
+CLIP_STORE_DIR = "cache/clips"
 
 # Settings for result 0 (digits modulo 6)
 SIGNAL_TYPE = "noise"  # רעש
@@ -23,131 +33,34 @@ SNR_MIN = 0  # dB
 SNR_MAX = 6  # dB
 MIN_NOISE_DURATION = 30  # seconds
 
+# The random choices of every clip are seeded by this seed and the clip's filename
+AUGMENTATION_SEED = 0
 
-def find_long_noise_files(noise_dir, min_duration=30):
-    """Find noise files longer than min_duration seconds"""
-    noise_files = [f for f in os.listdir(noise_dir) if f.endswith('.wav')]
-    long_files = []
-
-    for noise_file in noise_files:
-        filepath = os.path.join(noise_dir, noise_file)
-        try:
-            info = sf.info(filepath)
-            duration = info.duration
-            if duration > min_duration:
-                long_files.append(noise_file)
-        except Exception as e:
-            print(f"Warning: Could not read {noise_file}: {e}")
-
-    return long_files
-
-
-def calculate_rms(signal):
-    """Calculate Root Mean Square (RMS) of signal"""
-    return np.sqrt(np.mean(signal ** 2))
-
-
-def add_noise_at_snr(speech, noise, target_snr_db):
-    """
-    Add noise to speech signal at specified SNR
-
-    SNR (dB) = 20 * log10(RMS_signal / RMS_noise)
-
-    Returns: mixed signal
-    """
-    # Calculate RMS of speech and noise
-    rms_speech = calculate_rms(speech)
-    rms_noise = calculate_rms(noise)
-
-    # Calculate required noise scaling factor
-    # SNR_db = 20 * log10(rms_speech / rms_noise_scaled)
-    # 10^(SNR_db/20) = rms_speech / rms_noise_scaled
-    # rms_noise_scaled = rms_speech / 10^(SNR_db/20)
-    # scaling_factor = rms_noise_scaled / rms_noise
-
-    target_rms_noise = rms_speech / (10 ** (target_snr_db / 20))
-    scaling_factor = target_rms_noise / rms_noise if rms_noise > 0 else 0
-
-    # Scale and add noise
-    scaled_noise = noise * scaling_factor
-    mixed = speech + scaled_noise
-
-    return mixed
-
-
-def process_audio_file(audio_path, noise_files, noise_dir, output_dir):
-    """
-    Process a single audio file: add background noise
-
-    Returns: (background_file, start_point_sec, snr_db, output_path)
-    """
-    # Read speech audio (CommonVoice: 32kHz mono MP3)
-    speech, sr = sf.read(audio_path)
-
-    # Downsample from 32kHz to 16kHz to match Musan noise files
-    if sr == 32000:
-        speech = decimate(speech, 2)
-        sr = 16000
-
-    # Select random noise file
-    noise_file = random.choice(noise_files)
-    noise_path = os.path.join(noise_dir, noise_file)
-
-    # Read noise file (Musan: 16kHz mono WAV, >30 seconds)
-    noise, noise_sr = sf.read(noise_path)
-
-    # Select random starting point in noise
-    speech_samples = len(speech)
-    max_start_sample = len(noise) - speech_samples
-    start_sample = random.randint(0, max_start_sample)
-    start_point_sec = start_sample / noise_sr
-
-    # Extract noise segment of exact same length as speech
-    noise_segment = noise[start_sample:start_sample + speech_samples]
-
-    # Random SNR in range
-    snr_db = random.uniform(SNR_MIN, SNR_MAX)
-
-    # Add noise at target SNR
-    mixed = add_noise_at_snr(speech, noise_segment, snr_db)
-
-    # Create output filename
-    basename = os.path.basename(audio_path)
-    filename_without_ext = os.path.splitext(basename)[0]
-    output_path = os.path.join(output_dir, filename_without_ext + ".wav")
-
-    # Save mixed audio
-    sf.write(output_path, mixed, sr)
-
-    return noise_file, start_point_sec, snr_db, output_path
+# Stream the noisy clips to the transcription engine in memory, instead of writing them as WAV files and reading
+# them back, and whether to also save them as WAV files when streaming
+STREAM_NOISY_CLIPS = True
+SAVE_NOISY_CLIPS = False
 
 
 def main():
     """Main function to process all test files"""
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    configure_logging()
 
-    noise_files = find_long_noise_files(NOISE_DIR, MIN_NOISE_DURATION)
+    # Map the eligible noise files, building the noise bank if the noise files changed since it was built
+    noise_bank = NoiseBank.load_or_build(NOISE_DIR, NOISE_BANK_DIR, MIN_NOISE_DURATION)
 
-    if len(noise_files) == 0:
+    if len(noise_bank) == 0:
         print("Error: No suitable noise files found!")
         return
 
-    with open(TEST_TSV, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    header = lines[0].strip().split('\t')
-    path_idx = header.index('path')
-
-    test_files = []
-    for line in lines[1:]:
-        fields = line.strip().split('\t')
-        if len(fields) > path_idx:
-            filename = fields[path_idx]
-            test_files.append(filename)
+    # Stream the paths of the test clips
+    test_files = [filename for filename, in iter_tsv_rows(TEST_TSV, ['path']) if isinstance(filename, str)]
 
     log_entries = []
     log_entries.append(['Filename', 'Background file', 'Start point (in seconds)', 'SNR'])
 
+    # The paths of the clips, by filename without extension
+    audio_paths = {}
     for filename in test_files:
         audio_path = os.path.join(CLIPS_DIR, filename)
 
@@ -155,11 +68,37 @@ def main():
             print(f"Warning: File not found: {audio_path}")
             continue
 
-        try:
-            noise_file, start_sec, snr_db, output_path = process_audio_file(
-                audio_path, noise_files, NOISE_DIR, OUTPUT_DIR
-            )
+        audio_paths[os.path.splitext(filename)[0]] = audio_path
+
+    # Decode the clean clips once into the clip store (the clips decoded by previous runs are skipped), so the
+    # workers read them from the store instead of decoding them
+    clip_store = ClipStore(CLIP_STORE_DIR)
+    clip_store.build(audio_paths.values(), read_clip_durations(CLIP_DURATIONS_TSV), num_workers=os.cpu_count() or 1)
+
+    # Mix the clips with background noise across a pool of workers, getting the results in the order of the clips.
+    # When streaming, the noisy clips are saved as WAV files only if asked to.
+    augmentation_engine = AugmentationEngine(
+        noise_bank,
+        OUTPUT_DIR if SAVE_NOISY_CLIPS or not STREAM_NOISY_CLIPS else None,
+        SNR_MIN,
+        SNR_MAX,
+        seed=AUGMENTATION_SEED,
+        num_workers=os.cpu_count() or 1,
+        clip_store=clip_store
+    )
+
+    def augment_clips(clean_filenames, keep_audio):
+        # Augment the given clips, logging each of them and yielding their filenames with either the mixed audio
+        # or the path of the saved WAV file
+        paths = [audio_paths[clean_filename] for clean_filename in clean_filenames if clean_filename in audio_paths]
+        for audio_path, augmentation, audio, error in augmentation_engine.augment(paths, keep_audio=keep_audio):
+            filename = os.path.basename(audio_path)
 
+            if error is not None:
+                print(f"Error processing {filename}: {error}")
+                continue
+
+            noise_file, start_sec, snr_db, output_path = augmentation
             clean_filename = os.path.splitext(filename)[0]
 
             log_entries.append([
@@ -169,30 +108,53 @@ def main():
                 f"{snr_db:.2f}"
             ])
 
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
-            continue
-
-    with open(LOG_FILE, 'w', encoding='utf-8') as f:
-        for entry in log_entries:
-            f.write('\t'.join(entry) + '\n')
+            yield clean_filename, audio if keep_audio else output_path
 
     part1 = Part1(
         referenced_file=TEST_TSV,
         base_clips_dir=OUTPUT_DIR,
-        output_file=NOISY_TRANSCRIPTIONS_FILE
+        output_file=NOISY_TRANSCRIPTIONS_FILE,
+        num_workers=max(1, (os.cpu_count() or 1) // 4),
+        transcription_cache_file=TRANSCRIPTION_CACHE_FILE,
+        clip_durations_file=CLIP_DURATIONS_TSV
     )
     video_format = part1.read_referenced_file()
-    part1.transcribe_clips(video_format)
+
+    if STREAM_NOISY_CLIPS:
+        # Transcribe the noisy clips as they are mixed. All the clips are mixed again to log them, while the
+        # transcription cache skips the inference of the clips transcribed by previous runs.
+        part1.transcribe_clips(video_format, resume=False,
+                               clip_audio=lambda clean_filenames: augment_clips(clean_filenames, keep_audio=True))
+    else:
+        # Write all the noisy clips as WAV files, and then transcribe the clips that were written. The previous
+        # transcriptions are not resumed, as they may be of other mixtures (e.g. of another seed or SNR range), while
+        # the transcription cache skips the inference of the clips whose audio was transcribed before.
+        noisy_clips = dict(augment_clips(list(audio_paths), keep_audio=False))
+        part1.transcribe_clips(video_format, resume=False, clip_audio=lambda clean_filenames: (
+            (clean_filename, noisy_clips[clean_filename])
+            for clean_filename in clean_filenames if clean_filename in noisy_clips
+        ))
     part1.save_transcriptions()
 
+    # Write the log in the order of the clips (when streaming, they are augmented in the order they are transcribed)
+    order = {clean_filename: i for i, clean_filename in enumerate(audio_paths)}
+    log_entries[1:] = sorted(log_entries[1:], key=lambda entry: order[entry[0]])
+
+    with open(LOG_FILE, 'w', encoding='utf-8') as f:
+        for entry in log_entries:
+            f.write('\t'.join(entry) + '\n')
+
     part2 = Part2(
         input_transcriptions_file=NOISY_TRANSCRIPTIONS_FILE,
         output_statistics_file=STATISTICS_FILE,
-        output_transcriptions_file=NORMALIZED_TRANSCRIPTIONS_FILE
+        output_transcriptions_file=NORMALIZED_TRANSCRIPTIONS_FILE,
+        pair_weight_cache_file=PAIR_WEIGHT_CACHE_FILE,
+        normalization_cache_file=NORMALIZATION_CACHE_FILE,
+        spelling_cache_file=SPELLING_CACHE_FILE,
+        correction_audit_file=CORRECTION_AUDIT_FILE
     )
-    statistics_total = part2.process_transcriptions(to_normalize=True)
-    part2.save_statistics(statistics_total)
+    part2.process_transcriptions(to_normalize=True)
+    part2.save_statistics()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,114 @@
+import os
+from part1 import Part1
+from part2 import Part2
+from part4 import (TEST_TSV, CLIPS_DIR, CLIP_DURATIONS_TSV, NOISE_DIR, NOISE_BANKS_DIR, CLIP_STORE_DIR,
+                   MIN_NOISE_DURATION, AUGMENTATION_SEED, PAIR_WEIGHT_CACHE_FILE, TRANSCRIPTION_CACHE_FILE, NORMALIZATION_CACHE_FILE, SPELLING_CACHE_FILE)
+from modules.clip_store import ClipStore
+from modules.clip_schedule import longest_first
+from modules.corpus_io import TsvWriter, read_clip_durations
+from modules.logging_config import configure_logging
+from modules.noise_bank import NoiseBank
+from modules.snr_sweep import SNRSweep, condition_name, sweep_statistics
+from modules.statistics_df import StatisticsDF
+
+# The grid of the sweep: every noise category (a folder of Musan noise files) at every SNR
+MUSAN_NOISE_DIR = os.path.dirname(NOISE_DIR)
+NOISE_CATEGORIES = ["free-sound"]
+SNR_VALUES = [-5, 0, 5, 10, 20]  # dB
+
+# The transcriptions, statistics and augmentation log of every condition are written to the sweep folder
+SWEEP_DIR = "results/part4_sweep"
+SWEEP_STATISTICS_FILE = "results/part4_sweep_statistics.csv"
+
+
+def main():
+    """Main function to measure the accuracy of the transcriptions in every noise condition"""
+    configure_logging()
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+
+    # Map the eligible noise files of every category, building the noise banks if their noise files changed
+    noise_banks = {}
+    for category in NOISE_CATEGORIES:
+        noise_bank = NoiseBank.load_or_build(os.path.join(MUSAN_NOISE_DIR, category),
+                                             os.path.join(NOISE_BANKS_DIR, category), MIN_NOISE_DURATION)
+        if len(noise_bank) == 0:
+            print(f"Error: No suitable noise files found in {category}!")
+            return
+        noise_banks[category] = noise_bank
+
+    # Part1 reads the clips and transcribes the mixtures (the sweep writes a transcriptions file per condition)
+    part1 = Part1(
+        referenced_file=TEST_TSV,
+        base_clips_dir=CLIPS_DIR,
+        output_file=None,
+        num_workers=max(1, (os.cpu_count() or 1) // 4),
+        transcription_cache_file=TRANSCRIPTION_CACHE_FILE
+    )
+    video_format = part1.read_referenced_file()
+
+    clips = []
+    for transcription in part1.transciptions:
+        audio_path = os.path.join(CLIPS_DIR, f"{transcription['filename']}.{video_format}")
+        if not os.path.exists(audio_path):
+            print(f"Warning: File not found: {audio_path}")
+            continue
+        clips.append((transcription['filename'], audio_path))
+
+    # Decode the clean clips once into the clip store, shared with Part 4
+    clip_durations = read_clip_durations(CLIP_DURATIONS_TSV)
+    clip_store = ClipStore(CLIP_STORE_DIR)
+    clip_store.build([audio_path for _, audio_path in clips], clip_durations, num_workers=os.cpu_count() or 1)
+
+    # Mix and transcribe the clips longest-first, so the long clips don't tail the run
+    clips = longest_first(clips, {clip: clip_durations[clip[0]] for clip in clips if clip[0] in clip_durations})
+
+    # Mix every clip in all the conditions across a pool of workers, and transcribe the mixtures as they are mixed
+    sweep = SNRSweep(noise_banks, SNR_VALUES, seed=AUGMENTATION_SEED, num_workers=os.cpu_count() or 1,
+                     clip_store=clip_store)
+    transcriptions, log_entries = sweep.transcribe(clips, part1.engine)
+
+    print(f"Transcription throughput: {part1.engine.stats()}")
+    if part1.transcription_cache is not None:
+        print(f"Transcription cache: {part1.transcription_cache.stats()}")
+
+    statistics = {}
+    for condition in sweep.conditions:
+        name = condition_name(condition)
+        print(f"Condition: {name}")
+
+        # Write the log of the condition in the order of the referenced file
+        order = {transcription['filename']: i for i, transcription in enumerate(part1.transciptions)}
+        condition_log = sorted(log_entries[condition], key=lambda entry: order[entry[0]])
+        with open(os.path.join(SWEEP_DIR, f"{name}_augmentation_log.tsv"), 'w', encoding='utf-8') as f:
+            for entry in [['Filename', 'Background file', 'Start point (in seconds)', 'SNR']] + condition_log:
+                f.write('\t'.join(entry) + '\n')
+
+        # Write the transcriptions of the condition, in the order of the referenced file
+        transcriptions_file = os.path.join(SWEEP_DIR, f"{name}_transcriptions.tsv")
+        with TsvWriter(transcriptions_file, ['filename', 'reference_text', 'transcribed_text'],
+                       append=False, flush_every=1000) as writer:
+            for transcription in part1.transciptions:
+                if transcription['filename'] in transcriptions[condition]:
+                    writer.write_row({**transcription,
+                                      'transcribed_text': transcriptions[condition][transcription['filename']]})
+
+        part2 = Part2(
+            input_transcriptions_file=transcriptions_file,
+            output_statistics_file=os.path.join(SWEEP_DIR, f"{name}_statistics.csv"),
+            output_transcriptions_file=os.path.join(SWEEP_DIR, f"{name}_normalized_transcriptions.tsv"),
+            pair_weight_cache_file=PAIR_WEIGHT_CACHE_FILE,
+            normalization_cache_file=NORMALIZATION_CACHE_FILE,
+            spelling_cache_file=SPELLING_CACHE_FILE,
+            correction_audit_file=os.path.join(SWEEP_DIR, f"{name}_corrections.tsv")
+        )
+        part2.process_transcriptions(to_normalize=True)
+        part2.save_statistics()
+        statistics[condition] = part2.statistics
+
+    # Consolidate the statistics of all the conditions into one table (the average rates of their utterances)
+    df_out = StatisticsDF(sweep_statistics(statistics))
+    df_out.display()
+    df_out.save(SWEEP_STATISTICS_FILE)
+
+if __name__ == "__main__":
+    main()
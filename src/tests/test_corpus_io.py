@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from modules.clip_store import INDEX_FILE, ClipStore
+from modules.corpus_io import TsvWriter, read_tsv_rows
+
+COLUMNS = ['filename', 'reference_text', 'transcribed_text']
+
+
+class TsvWriterResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'transcriptions.tsv')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_append_after_partial_line(self):
+        # A run that crashed while writing the row of b
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            f.write('filename\treference_text\ttranscribed_text\na\tx\ty\nb\tpartial')
+
+        self.assertEqual(read_tsv_rows(self.filename),
+                         [{'filename': 'a', 'reference_text': 'x', 'transcribed_text': 'y'}])
+
+        # Resume, appending the rows of the remaining clips
+        with TsvWriter(self.filename, COLUMNS, append=True) as writer:
+            writer.write_row({'filename': 'b', 'reference_text': 'x', 'transcribed_text': ''})
+            writer.write_row({'filename': 'c', 'reference_text': 'x', 'transcribed_text': 'z'})
+
+        self.assertEqual(read_tsv_rows(self.filename), [
+            {'filename': 'a', 'reference_text': 'x', 'transcribed_text': 'y'},
+            {'filename': 'b', 'reference_text': 'x', 'transcribed_text': ''},
+            {'filename': 'c', 'reference_text': 'x', 'transcribed_text': 'z'}
+        ])
+
+    def test_append_after_partial_header(self):
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            f.write('filename\trefer')
+
+        with TsvWriter(self.filename, COLUMNS, append=True) as writer:
+            writer.write_row({'filename': 'a', 'reference_text': 'x', 'transcribed_text': 'y'})
+
+        self.assertEqual(read_tsv_rows(self.filename),
+                         [{'filename': 'a', 'reference_text': 'x', 'transcribed_text': 'y'}])
+
+    def test_clip_store_after_partial_index_line(self):
+        store = ClipStore(self.directory.name)
+        store.add('a', np.ones(3, dtype=np.float32))
+        store.close()
+
+        # An interrupted write of the index entry of b
+        with open(os.path.join(self.directory.name, INDEX_FILE), 'a', encoding='utf-8') as f:
+            f.write('b\t12')
+
+        store = ClipStore(self.directory.name)
+        store.add('c', np.zeros(2, dtype=np.float32))
+        store.close()
+
+        store = ClipStore(self.directory.name, read_only=True)
+        self.assertEqual(store.index, {'a': (0, 3), 'c': (3, 2)})
+        np.testing.assert_array_equal(store.get('c'), np.zeros(2, dtype=np.float32))
+
+
+if __name__ == '__main__':
+    unittest.main()